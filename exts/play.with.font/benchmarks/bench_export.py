@@ -0,0 +1,51 @@
+"""
+Benchmark mesh export formats (OBJ text, binary PLY, USD crate) on a long string.
+
+Run from anywhere, outside of Kit (USD export needs pxr, e.g. `pip install usd-core`):
+    python exts/play.with.font/benchmarks/bench_export.py
+"""
+import os
+import sys
+import time
+import argparse
+import importlib.util
+import tempfile
+
+EXTENSION_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(EXTENSION_ROOT, "play", "with", "font"))
+
+from font.font_create import MeshGenerator
+
+
+BANNER = "The quick brown fox jumps over the lazy dog "
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="mesh export benchmark")
+    parser.add_argument("--font", default="timesbd.ttf")
+    parser.add_argument("--height", type=int, default=52)
+    parser.add_argument("--length", type=int, default=200)
+    args = parser.parse_args()
+
+    text = (BANNER * (args.length // len(BANNER) + 1))[:args.length]
+    mesh_generator = MeshGenerator(os.path.join(EXTENSION_ROOT, "fonts", args.font), height=args.height, text=text, extrude=-768)
+    mesh_generator.generateMesh(create_obj=True)
+    mesh = mesh_generator.mesh
+    print(f"chars: {args.length} vertices: {mesh.vertexCount} triangles: {mesh.indexCount // 3}")
+
+    exporters = [("obj", mesh.saveOBJ), ("ply", mesh.savePLY)]
+    if importlib.util.find_spec("pxr") is not None:
+        exporters += [("usd", mesh.saveUSD)]
+    else:
+        print("pxr not found, skip usd")
+
+    with tempfile.TemporaryDirectory() as folder:
+        print(f"{'format':>6} {'seconds':>10} {'MB':>10}")
+        for extension, save in exporters:
+            file_path = os.path.join(folder, f"text.{extension}")
+            save(file_path) # warm up (plugin loading)
+
+            begin = time.time()
+            save(file_path)
+            elapse = time.time() - begin
+            print(f"{extension:>6} {elapse:>10.3f} {os.path.getsize(file_path) / 1e6:>10.2f}")
@@ -0,0 +1,67 @@
+"""
+Benchmark authoring flow emitters: one prim at a time through the Usd API
+against one Sdf.ChangeBlock batch at the layer level.
+
+Run from anywhere, outside of Kit (needs usd-core):
+    python exts/play.with.font/benchmarks/bench_flow_author.py --counts 100 1000
+"""
+import os
+import sys
+import time
+import argparse
+
+from pxr import Usd, UsdGeom, Gf
+
+EXTENSION_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(EXTENSION_ROOT, "play", "with", "font"))
+
+from flow.flow_author import author_flow_emitters, emitter_attributes
+
+
+def author_per_prim(stage, root_path, points, attributes):
+    """
+    Reference path: define and set every prim and attribute through the stage
+    """
+    for i, point in enumerate(points):
+        xform = UsdGeom.Xform.Define(stage, f"{root_path}/Xform_{i}")
+        xform.AddTranslateOp().Set(Gf.Vec3d(*point))
+
+        emitter = stage.DefinePrim(f"{root_path}/Xform_{i}/flowEmitterSphere", "FlowEmitterSphere")
+        for name, (value_type, value) in attributes.items():
+            emitter.CreateAttribute(name, value_type, False).Set(value)
+
+
+def new_stage(root_path):
+    stage = Usd.Stage.CreateInMemory()
+    UsdGeom.Xform.Define(stage, root_path)
+    # a populated stage makes every change notice more expensive
+    for i in range(200):
+        UsdGeom.Cube.Define(stage, f"/World/Props/Cube_{i}")
+
+    return stage
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="flow emitter authoring benchmark")
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    root_path = "/World/Text_Flow"
+    attributes = emitter_attributes("Fire", 5.0, 1)
+
+    print(f"{'emitters':>8} {'per prim (s)':>14} {'batch (s)':>10}")
+    for count in args.counts:
+        points = [(0.5 * i, 0.25 * i, 0.0) for i in range(count)]
+
+        stage = new_stage(root_path)
+        begin = time.time()
+        author_per_prim(stage, root_path, points, attributes)
+        per_prim_elapse = time.time() - begin
+
+        stage = new_stage(root_path)
+        begin = time.time()
+        author_flow_emitters(stage.GetEditTarget().GetLayer(), root_path, points, attributes)
+        batch_elapse = time.time() - begin
+
+        assert len(stage.GetPrimAtPath(root_path).GetChildren()) == count
+        print(f"{count:>8} {per_prim_elapse:>14.3f} {batch_elapse:>10.3f}")
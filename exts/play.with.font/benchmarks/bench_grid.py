@@ -0,0 +1,97 @@
+"""
+Benchmark interior grid sampling (particle seeding) over a short string:
+point by point loop, vectorized per polygon, and one scanline pass over the whole text.
+The particle seeding modes are compared in bench_seeding.py.
+
+Run from anywhere, outside of Kit:
+    python exts/play.with.font/benchmarks/bench_grid.py --grid-sizes 1 2 5 10
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import shapely
+from shapely.geometry import Point
+from shapely.prepared import prep
+
+EXTENSION_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(EXTENSION_ROOT, "play", "with", "font"))
+
+from font.font_create import MeshGenerator
+from font.font_util import grid_points_inside_polygon, scanline_grid_points
+from font.glyph_cache import GlyphCache
+
+
+def grid_points_inside_polygon_loop(polygon, grid_size):
+    """
+    Reference point by point sampler
+    """
+    latmin, lonmin, latmax, lonmax = polygon.bounds
+    prep_polygon = prep(polygon)
+
+    points = []
+    for lat in range(int(latmin), int(latmax) + grid_size, grid_size):
+        for lon in range(int(lonmin), int(lonmax), grid_size):
+            points.append(Point((lat, lon)))
+
+    return [(p.x, p.y) for p in filter(prep_polygon.covers, points)]
+
+
+def check_scanline_points(polygon, grid_size):
+    """
+    Assert the scanline fill of one polygon gives the points of grid_points_inside_polygon on the same lattice.
+    Points on the outline (within rounding) are left out: covers keeps all of them, the half open scanline
+    only those on the left and bottom side of a span. Returns the number of such boundary points.
+    """
+    rings = [np.asarray(polygon.exterior.coords)] + [np.asarray(ring.coords) for ring in polygon.interiors]
+    scan_points = scanline_grid_points(rings, grid_size)
+    points = grid_points_inside_polygon(polygon, grid_size)
+
+    on_boundary = shapely.dwithin(polygon.boundary, shapely.points(points), 1e-9)
+    scan_on_boundary = shapely.dwithin(polygon.boundary, shapely.points(scan_points), 1e-9)
+    assert set(map(tuple, points[~on_boundary])) == set(map(tuple, scan_points[~scan_on_boundary])), \
+        f"scanline points differ from grid_points_inside_polygon at grid {grid_size}"
+
+    return int(np.count_nonzero(on_boundary))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="interior grid sampling benchmark")
+    parser.add_argument("--font", default="timesbd.ttf")
+    parser.add_argument("--height", type=int, default=4, help="small heights keep grid sizes 1-10 in a sensible point range")
+    parser.add_argument("--text", default="Omniverse Play With Font")
+    parser.add_argument("--grid-sizes", type=int, nargs="+", default=list(range(1, 11)))
+    parser.add_argument("--skip-loop", action="store_true", help="only time the vectorized sampler")
+    parser.add_argument("--skip-check", action="store_true", help="do not compare the scanline points with the per polygon sampler")
+    args = parser.parse_args()
+
+    mesh_generator = MeshGenerator(os.path.join(EXTENSION_ROOT, "fonts", args.font), height=args.height,
+        text=args.text, glyph_cache=GlyphCache())
+    mesh_generator.generateMesh(create_obj=False)
+    polygons = mesh_generator.polygons
+
+    print(f"font: {args.font} height: {args.height} text: {args.text!r} polygons: {len(polygons)}")
+    print(f"{'grid':>6} {'points':>10} {'loop (s)':>10} {'numpy (s)':>10} {'scan pts':>10} {'scan (s)':>10} {'on edge':>8}")
+    for grid_size in args.grid_sizes:
+        begin = time.time()
+        count = sum(len(grid_points_inside_polygon(polygon, grid_size)) for polygon in polygons)
+        numpy_elapse = time.time() - begin
+
+        loop_elapse = float("nan")
+        if not args.skip_loop:
+            begin = time.time()
+            loop_count = sum(len(grid_points_inside_polygon_loop(polygon, grid_size)) for polygon in polygons)
+            loop_elapse = time.time() - begin
+            assert loop_count == count
+
+        begin = time.time()
+        scan_count = len(mesh_generator.getGridPointsInside(grid_size))
+        scan_elapse = time.time() - begin
+
+        boundary_count = "-"
+        if not args.skip_check:
+            boundary_count = sum(check_scanline_points(polygon, grid_size) for polygon in polygons)
+
+        print(f"{grid_size:>6} {count:>10} {loop_elapse:>10.3f} {numpy_elapse:>10.4f} {scan_count:>10} {scan_elapse:>10.4f} {boundary_count:>8}")
@@ -0,0 +1,51 @@
+"""
+Benchmark 3D text mesh generation on strings of increasing length.
+
+Run from anywhere, outside of Kit:
+    python exts/play.with.font/benchmarks/bench_mesh.py
+"""
+import os
+import sys
+import time
+import argparse
+
+EXTENSION_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(EXTENSION_ROOT, "play", "with", "font"))
+
+from font.font_create import MeshGenerator
+from font.glyph_cache import GlyphCache, DiskGlyphCache
+
+
+BANNER = "The quick brown fox jumps over the lazy dog "
+
+
+def bench(font_file, text, height, glyph_cache):
+    begin = time.time()
+    mesh_generator = MeshGenerator(font_file, height=height, text=text, extrude=-768, glyph_cache=glyph_cache)
+    mesh_generator.generateMesh(create_obj=True)
+    elapse = time.time() - begin
+
+    return elapse, mesh_generator.mesh.vertexCount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="3D text mesh generation benchmark")
+    parser.add_argument("--font", default="timesbd.ttf")
+    parser.add_argument("--height", type=int, default=256)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[5, 10, 20, 30])
+    parser.add_argument("--disk-cache", default=None, help="glyph cache folder, run twice to time a warm start")
+    args = parser.parse_args()
+
+    font_file = os.path.join(EXTENSION_ROOT, "fonts", args.font)
+    print(f"font: {args.font} height: {args.height}")
+    print(f"{'chars':>6} {'vertices':>10} {'seconds':>10} {'ms/char':>10} {'warm (s)':>10}")
+    for length in args.lengths:
+        text = (BANNER * (length // len(BANNER) + 1))[:length]
+
+        # cold: empty glyph cache, warm: same cache again
+        glyph_cache = GlyphCache()
+        if args.disk_cache:
+            glyph_cache.disk_cache = DiskGlyphCache(args.disk_cache)
+        elapse, vertex_count = bench(font_file, text, args.height, glyph_cache)
+        warm_elapse, _ = bench(font_file, text, args.height, glyph_cache)
+        print(f"{length:>6} {vertex_count:>10} {elapse:>10.3f} {1000 * elapse / length:>10.2f} {warm_elapse:>10.3f}")
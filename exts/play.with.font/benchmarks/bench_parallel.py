@@ -0,0 +1,47 @@
+"""
+Benchmark parallel glyph tessellation on paragraph-length text (cold glyph cache).
+
+Run from anywhere, outside of Kit:
+    python exts/play.with.font/benchmarks/bench_parallel.py --workers 1 2 4
+"""
+import os
+import sys
+import time
+import argparse
+
+EXTENSION_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(EXTENSION_ROOT, "play", "with", "font"))
+
+from font.font_create import MeshGenerator, get_process_pool, shutdown_process_pools
+from font.glyph_cache import GlyphCache
+
+
+PARAGRAPH = (
+    "Sphinx of black quartz, judge my vow! Pack my box with five dozen liquor jugs. "
+    "How vexingly quick daft zebras jump; The five boxing wizards jump quickly. "
+    "JACKDAWS LOVE MY BIG SPHINX OF QUARTZ 0123456789 (#$%&*+-/:;<=>?@[]^_{|}~)"
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="parallel glyph tessellation benchmark")
+    parser.add_argument("--font", default="timesbd.ttf")
+    parser.add_argument("--height", type=int, default=256)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    font_file = os.path.join(EXTENSION_ROOT, "fonts", args.font)
+    print(f"font: {args.font} height: {args.height} chars: {len(PARAGRAPH)} unique: {len(set(PARAGRAPH))} cpus: {os.cpu_count()}")
+    print(f"{'workers':>8} {'vertices':>10} {'seconds':>10}")
+    for workers in args.workers:
+        # start the pool outside of the timing
+        if workers > 1:
+            get_process_pool(workers).submit(os.getpid).result()
+
+        mesh_generator = MeshGenerator(font_file, height=args.height, text=PARAGRAPH, extrude=-768, glyph_cache=GlyphCache())
+        begin = time.time()
+        mesh_generator.generateMesh(create_obj=True, workers=workers)
+        elapse = time.time() - begin
+        print(f"{workers:>8} {mesh_generator.mesh.vertexCount:>10} {elapse:>10.3f}")
+
+    shutdown_process_pools()
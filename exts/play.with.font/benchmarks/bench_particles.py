@@ -0,0 +1,68 @@
+"""
+Benchmark building particle arrays: Gf.Vec3f lists (previous FluidGenerator path)
+against one Vt.Vec3fArray.FromNumpy buffer copy from an (N, 3) float32 array.
+
+Run from anywhere, outside of Kit (needs usd-core):
+    python exts/play.with.font/benchmarks/bench_particles.py --counts 10000 100000 1000000
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+from pxr import Gf, Vt
+
+EXTENSION_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(EXTENSION_ROOT, "play", "with", "font"))
+
+from fluid.fluid_util import particle_positions
+
+
+def build_lists(points, scale):
+    """
+    Reference path: python lists of Gf.Vec3f, then Vt arrays
+    """
+    particle_positions = [[p[0] / scale, p[1] / scale, 0] for p in points]
+
+    positions_list = [Gf.Vec3f(*p) for p in particle_positions]
+    velocities_list = [Gf.Vec3f(0, 0, 0) for _ in range(len(particle_positions))]
+    protoIndices_list = [0 for _ in range(len(particle_positions))]
+
+    return Vt.Vec3fArray(positions_list), Vt.Vec3fArray(velocities_list), Vt.IntArray(protoIndices_list)
+
+
+def build_arrays(points, scale):
+    positions = particle_positions(points, scale)
+
+    return Vt.Vec3fArray.FromNumpy(positions), Vt.Vec3fArray.FromNumpy(np.zeros_like(positions)), \
+        Vt.IntArray.FromNumpy(np.zeros(len(positions), dtype=np.int32))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--counts", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--scale", type=float, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'particles':>10} {'lists':>10} {'numpy':>10} {'speedup':>8}")
+    for count in args.counts:
+        points = rng.uniform(-2000, 2000, (count, 2))
+
+        begin = time.perf_counter()
+        reference = build_lists(points.tolist(), args.scale)
+        list_time = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        result = build_arrays(points, args.scale)
+        array_time = time.perf_counter() - begin
+
+        assert np.allclose(np.array(reference[0]), np.array(result[0]), atol=1e-4)
+        assert len(reference[1]) == len(result[1]) and len(reference[2]) == len(result[2])
+
+        print(f"{count:>10} {list_time * 1000:>8.1f}ms {array_time * 1000:>8.1f}ms {list_time / max(array_time, 1e-9):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark the headless pipeline: author text, flow and fluid into in-memory stages,
+one stage per text, sequentially or across a process pool.
+
+Run from anywhere, outside of Kit (needs usd-core):
+    python exts/play.with.font/benchmarks/bench_pipeline.py --stages 16 --workers 1 4
+"""
+import os
+import sys
+import time
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+
+EXTENSION_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, EXTENSION_ROOT)
+
+# "with" is a keyword: the package can only be imported by name
+pipeline = importlib.import_module("play.with.font.pipeline")
+
+
+def author_stage(text, font_file, output_dir = None):
+    """
+    One text effect in its own stage, returns the seconds it took
+    """
+    begin = time.time()
+    stage = pipeline.new_stage()
+    font_prim, mesh_generator = pipeline.author_text(stage, text, font_file)
+    pipeline.author_flow(stage, font_prim, mesh_generator, emitter_mode="point")
+    pipeline.author_fluid(stage, font_prim, mesh_generator)
+
+    if output_dir:
+        stage.GetRootLayer().Export(os.path.join(output_dir, f"{abs(hash(text))}.usdc"))
+
+    return time.time() - begin
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="headless text effect pipeline benchmark")
+    parser.add_argument("--font", default="timesbd.ttf")
+    parser.add_argument("--stages", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--output", default=None, help="export each stage as .usdc into this folder")
+    args = parser.parse_args()
+
+    font_file = os.path.join(EXTENSION_ROOT, "fonts", args.font)
+    texts = [f"Text effect {i:04d}" for i in range(args.stages)]
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    print(f"font: {args.font} stages: {args.stages} cpus: {os.cpu_count()}")
+    print(f"{'workers':>8} {'total (s)':>10} {'per stage (ms)':>15} {'stages/s':>10}")
+    for workers in args.workers:
+        begin = time.time()
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(author_stage, texts, [font_file] * len(texts), [args.output] * len(texts)))
+        else:
+            for text in texts:
+                author_stage(text, font_file, args.output)
+        elapse = time.time() - begin
+
+        print(f"{workers:>8} {elapse:>10.3f} {1000 * elapse / len(texts):>15.1f} {len(texts) / elapse:>10.1f}")
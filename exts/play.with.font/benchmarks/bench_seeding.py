@@ -0,0 +1,70 @@
+"""
+Benchmark the particle seeding modes of MeshGenerator.getSeedPointsInside:
+point count against the square lattice, time, and the gaps left between particles
+(distance from a fine interior lattice to the nearest particle, 99th percentile and maximum).
+The deep columns only use lattice points at least one grid size away from the outline, where
+the gaps are those of the seeding pattern rather than of where it is cut by the glyph edges.
+
+Run from anywhere, outside of Kit:
+    python exts/play.with.font/benchmarks/bench_seeding.py --text Hello --grid-sizes 20 40 80
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import shapely
+from shapely import affinity
+
+EXTENSION_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(EXTENSION_ROOT, "play", "with", "font"))
+
+from font.font_create import MeshGenerator
+from font.font_util import scanline_grid_points, SEEDING_SPACING
+from font.glyph_cache import GlyphCache
+
+
+def particle_gaps(mesh_generator, points, grid_size):
+    """
+    Distance from every point of a grid_size / 4 interior lattice to its nearest particle,
+    and whether the lattice point is at least grid_size away from the outline
+    """
+    probes = shapely.points(scanline_grid_points(mesh_generator.outlines, grid_size / 4))
+    tree = shapely.STRtree(shapely.points(points))
+    _, distances = tree.query_nearest(probes, return_distance=True, all_matches=False)
+
+    text = shapely.union_all([affinity.translate(polygon, offset) for polygon, offset in zip(mesh_generator.polygons, mesh_generator.offsets)])
+    deep = shapely.covers(text.buffer(-grid_size), probes)
+
+    return distances, deep
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="particle seeding benchmark")
+    parser.add_argument("--font", default="timesbd.ttf")
+    parser.add_argument("--height", type=int, default=52)
+    parser.add_argument("--text", default="Hello")
+    parser.add_argument("--grid-sizes", type=int, nargs="+", default=[20, 40, 80])
+    parser.add_argument("--modes", nargs="+", default=list(SEEDING_SPACING), choices=list(SEEDING_SPACING))
+    args = parser.parse_args()
+
+    mesh_generator = MeshGenerator(os.path.join(EXTENSION_ROOT, "fonts", args.font), height=args.height,
+        text=args.text, glyph_cache=GlyphCache())
+    mesh_generator.generateMesh(create_obj=False)
+
+    print(f"font: {args.font} height: {args.height} text: {args.text!r}")
+    print(f"{'grid':>6} {'mode':>8} {'spacing':>8} {'points':>10} {'vs grid':>8} {'time (s)':>10} {'p99 gap':>8} {'max gap':>8} "
+        f"{'deep p99':>8} {'deep max':>8}")
+    for grid_size in args.grid_sizes:
+        grid_count = len(mesh_generator.getGridPointsInside(grid_size))
+        for mode in args.modes:
+            begin = time.time()
+            points = mesh_generator.getSeedPointsInside(grid_size, mode=mode, seed=0)
+            elapse = time.time() - begin
+
+            gaps, deep = particle_gaps(mesh_generator, points, grid_size)
+            deep_gaps = gaps[deep] if np.any(deep) else np.full(1, np.nan)
+            print(f"{grid_size:>6} {mode:>8} {grid_size * SEEDING_SPACING[mode]:>8.1f} {len(points):>10} "
+                f"{len(points) / max(grid_count, 1) - 1:>+8.1%} {elapse:>10.4f} {np.percentile(gaps, 99):>8.1f} {gaps.max():>8.1f} "
+                f"{np.percentile(deep_gaps, 99):>8.1f} {deep_gaps.max():>8.1f}")
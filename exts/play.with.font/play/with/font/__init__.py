@@ -1 +1,7 @@
-from .extension import *
+# the Kit extension needs omni, the generation modules (font, flow authoring, pipeline) do not
+try:
+    import omni.ext
+except ImportError:
+    pass
+else:
+    from .extension import *
@@ -0,0 +1,257 @@
+"""
+Batch text mesh generator, outside of Kit.
+
+    python -m play.with.font.cli manifest.csv --output model/batch --format ply --workers 4
+
+The manifest is a CSV (with a header) or JSONL file, one mesh per row:
+    text (required), font, height, extrude, bezierSteps, name (output file name without extension)
+Run from the extension root (exts/play.with.font) or put it on PYTHONPATH.
+"""
+import os
+import re
+import sys
+import csv
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .font.font_create import MeshGenerator
+from .font.glyph_cache import GLYPH_CACHE, DiskGlyphCache
+
+
+EXTENSION_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# bump when a change in generation makes previous outputs stale
+GENERATOR_VERSION = 1
+
+# defaults of the extension UI (font size and extrude sliders)
+DEFAULTS = {"font": "timesbd.ttf", "height": 52, "extrude": 768, "bezierSteps": 3}
+FORMATS = {"obj": ".obj", "ply": ".ply", "usd": ".usdc"}
+
+# output file -> content hash of its inputs
+INDEX_FILE = ".manifest_index.json"
+
+
+def read_manifest(manifest_file):
+    """
+    (line number, row) of a CSV or JSONL manifest, rows are parsed per item by parse_item
+    """
+    rows = []
+    with open(manifest_file, newline="", encoding="utf-8") as f:
+        if manifest_file.lower().endswith((".jsonl", ".json")):
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    rows.append((line_number, line))
+        else:
+            reader = csv.DictReader(f)
+            for row in reader:
+                rows.append((reader.line_num, row))
+
+    return rows
+
+
+def parse_item(row):
+    """
+    Manifest row (a CSV dict or a JSONL line) with defaults filled in, raises ValueError on a bad row
+    """
+    if isinstance(row, str):
+        row = json.loads(row)
+        if not isinstance(row, dict):
+            raise ValueError(f"manifest row is not an object: {row}")
+
+    # DictReader puts the values past the header under a None key
+    if None in row:
+        raise ValueError(f"manifest row with more fields than the header: {row[None]}")
+    if not all(isinstance(key, str) for key in row):
+        raise ValueError(f"manifest row with non-string keys: {row}")
+
+    row = {key: value for key, value in row.items() if value not in (None, "")}
+    if "text" not in row:
+        raise ValueError(f"manifest row without text: {row}")
+    for key in ("text", "font", "name"):
+        if key in row and not isinstance(row[key], str):
+            raise ValueError(f"{key} is not a string: {row[key]!r}")
+
+    item = dict(DEFAULTS, **row)
+    for key in ("height", "extrude", "bezierSteps"):
+        try:
+            item[key] = int(item[key])
+        except (TypeError, ValueError):
+            raise ValueError(f"{key} is not an integer: {item[key]!r}") from None
+
+    return item
+
+
+def resolve_font(font):
+    """
+    Bundled font name or path to a font file
+    """
+    if os.path.isfile(font):
+        return os.path.abspath(font)
+
+    return os.path.join(EXTENSION_ROOT, "fonts", font)
+
+
+def output_name(item):
+    if "name" in item:
+        return item["name"]
+
+    slug = re.sub(r"[^0-9A-Za-z]+", "_", item["text"]).strip("_")[:40] or "text"
+    digest = hashlib.sha1(repr((item["text"], item["font"], item["height"], item["extrude"], item["bezierSteps"])).encode("utf-8"))
+    return f"{slug}_{digest.hexdigest()[:8]}"
+
+
+_FONT_HASHES = {}
+
+def content_hash(item, font_file, output_format):
+    """
+    Hash of everything the output depends on: parameters, font file content and generator version
+    """
+    font_hash = _FONT_HASHES.get(font_file)
+    if font_hash is None:
+        with open(font_file, "rb") as f:
+            font_hash = hashlib.sha1(f.read()).hexdigest()
+        _FONT_HASHES[font_file] = font_hash
+
+    key = (GENERATOR_VERSION, output_format, item["text"], font_hash, item["height"], item["extrude"], item["bezierSteps"])
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+def generate_items(jobs, glyph_cache_dir = None, stream = False):
+    """
+    Worker task: generate and save a list of (item, font file, output file),
+    returns (output file, seconds, vertex count) per generated item and (output file, error) per failed item
+    ::params:
+        stream: write OBJ/PLY glyph by glyph instead of building the whole mesh first
+    """
+    if glyph_cache_dir and GLYPH_CACHE.disk_cache is None:
+        GLYPH_CACHE.disk_cache = DiskGlyphCache(glyph_cache_dir)
+
+    results = []
+    errors = []
+    for item, font_file, output_file in jobs:
+        begin = time.time()
+        extension = os.path.splitext(output_file)[1]
+        temp_file = f"{output_file}.{os.getpid()}.tmp{extension}"
+        try:
+            mesh_generator = MeshGenerator(font_file, height=item["height"], text=item["text"],
+                bezierSteps=item["bezierSteps"], extrude=-item["extrude"])
+
+            if stream:
+                vertex_count, _ = mesh_generator.streamMesh(temp_file)
+            else:
+                mesh_generator.generateMesh(create_obj=True)
+                if extension == ".ply":
+                    mesh_generator.mesh.savePLY(temp_file)
+                elif extension == ".usdc":
+                    mesh_generator.mesh.saveUSD(temp_file)
+                else:
+                    mesh_generator.mesh.saveOBJ(temp_file)
+                vertex_count = mesh_generator.mesh.vertexCount
+            os.replace(temp_file, output_file)
+        except Exception as e:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            errors.append((output_file, f"{type(e).__name__}: {e}"))
+            continue
+
+        results.append((output_file, time.time() - begin, vertex_count))
+
+    return results, errors
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog="python -m play.with.font.cli", description="batch 3D text mesh generator")
+    parser.add_argument("manifest", help="CSV or JSONL manifest")
+    parser.add_argument("--output", default=os.path.join(EXTENSION_ROOT, "model", "batch"))
+    parser.add_argument("--format", choices=sorted(FORMATS), default="obj")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=32, help="items per worker task, items sharing a font are kept together")
+    parser.add_argument("--glyph-cache", default=None, help="persistent glyph cache folder shared by the workers")
+    parser.add_argument("--force", action="store_true", help="regenerate unchanged entries")
+    parser.add_argument("--stream", action="store_true", help="write OBJ/PLY glyph by glyph, memory bounded by one glyph")
+    args = parser.parse_args(argv)
+
+    begin = time.time()
+    rows = read_manifest(args.manifest)
+    os.makedirs(args.output, exist_ok=True)
+
+    index_file = os.path.join(args.output, INDEX_FILE)
+    index = {}
+    if os.path.exists(index_file):
+        with open(index_file, encoding="utf-8") as f:
+            index = json.load(f)
+
+    # skip entries whose inputs did not change since their output was written
+    jobs = []
+    hashes = {}
+    skipped = 0
+    failed = 0
+    for line_number, row in rows:
+        # bad rows, missing or unreadable fonts are reported, the rest of the batch goes on
+        try:
+            item = parse_item(row)
+            output_file = os.path.join(args.output, output_name(item) + FORMATS[args.format])
+            font_file = resolve_font(item["font"])
+            digest = content_hash(item, font_file, args.format)
+        except (OSError, ValueError) as e:
+            failed += 1
+            print(f"[play.with.font] failed {os.path.basename(args.manifest)}:{line_number}: {e}", file=sys.stderr)
+            continue
+
+        file_name = os.path.basename(output_file)
+        if not args.force and index.get(file_name) == digest and os.path.exists(output_file):
+            skipped += 1
+            continue
+
+        hashes[output_file] = digest
+        jobs.append((item, font_file, output_file))
+
+    # keep items of one font configuration in the same task so they share the worker's glyph cache
+    jobs.sort(key=lambda job: (job[1], job[0]["height"], job[0]["extrude"], job[0]["bezierSteps"]))
+    chunks = [jobs[i:i + args.chunk] for i in range(0, len(jobs), args.chunk)]
+
+    vertex_total = 0
+    generated = 0
+    def record(task_results):
+        nonlocal vertex_total, generated, failed
+        results, errors = task_results
+        generated += len(results)
+        for output_file, elapse, vertex_count in results:
+            index[os.path.basename(output_file)] = hashes[output_file]
+            vertex_total += vertex_count
+            print(f"{elapse * 1000:>9.1f} ms {vertex_count:>9} vertices  {os.path.basename(output_file)}")
+
+        failed += len(errors)
+        for output_file, error in errors:
+            print(f"[play.with.font] failed {os.path.basename(output_file)}: {error}", file=sys.stderr)
+
+    # finished outputs are recorded even when the run is interrupted
+    try:
+        if args.workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                futures = {pool.submit(generate_items, chunk, args.glyph_cache, args.stream): chunk for chunk in chunks}
+                for future in as_completed(futures):
+                    try:
+                        record(future.result())
+                    except Exception as e: # worker process lost
+                        failed += len(futures[future])
+                        print("[play.with.font] task failed:", e, file=sys.stderr)
+        else:
+            for chunk in chunks:
+                record(generate_items(chunk, args.glyph_cache, args.stream))
+    finally:
+        with open(index_file, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+
+    elapse = time.time() - begin
+    print(f"items: {len(rows)} generated: {generated} skipped: {skipped} failed: {failed}")
+    print(f"total: {elapse:.2f} s  {generated / max(elapse, 1e-9):.1f} items/s  {vertex_total / max(elapse, 1e-9):.0f} vertices/s")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
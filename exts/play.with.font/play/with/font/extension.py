@@ -1,6 +1,7 @@
 import os
 import time
 import asyncio
+from collections import OrderedDict
 
 #　omni import 
 import omni
@@ -36,10 +37,14 @@ except:
     import triangle
 
 ################################ flaming font import ####################################
-from .param import EXTENSION_ROOT, FONT_TYPES 
-from .font.font_create import MeshGenerator
+from .param import EXTENSION_ROOT, FONT_TYPES, GLYPH_CACHE_DIR, GLYPH_CACHE_MAX_BYTES, MESH_GENERATOR_CACHE_SIZE, FLUID_SEEDING_MODES
+from .font.font_create import MeshGenerator, shutdown_process_pools
+from .font.glyph_cache import GLYPH_CACHE, DiskGlyphCache
+from .font.font_usd import define_font_mesh
+from .font.face_pool import FACE_POOL
 from .flow.flow_generate import FlowGenerator
-from .fluid.fluid_generate import FluidGenerator
+from .flow import flow_generate
+from .fluid.fluid_generate import FluidGenerator, PARTICLE_SYSTEMS
 from .formable.deformable_generate import DeformableBodyGenerator
 
 
@@ -64,9 +69,15 @@ class MyExtension(omni.ext.IExt):
 
         # component
         self.mesh_generator: MeshGenerator = None
-        self.mesh_generator_cache = {}
+        # input text -> MeshGenerator (outlines for flow and fluid), least recently used evicted
+        self.mesh_generator_cache = OrderedDict()
+        self.export_obj = False
+
+        # glyph meshes persist across sessions
+        GLYPH_CACHE.disk_cache = DiskGlyphCache(GLYPH_CACHE_DIR, max_bytes=GLYPH_CACHE_MAX_BYTES)
 
         self.flow_type = "Fire"
+        self.flow_emitter_mode = "sphere"
         self.flow_generator = None
 
         self.fluid_generator = None
@@ -96,6 +107,7 @@ class MyExtension(omni.ext.IExt):
                                 tooltip = "Extrude value for 3D model.")
                             # self.font_bezier_ui = CustomSliderWidget(min=1, max=4, label="Bezier step:", default_val=3, 
                             #     tooltip = "Bezier step to make the font model, heigher value gets smoother contours.")
+                            CustomBoolWidget(label ="Export OBJ:", default_value=False, tooltip = "Also save the 3D text as an .obj file in the model folder.", on_checked_fn = self.set_export_obj)
                            
                             ui.Button("Generate 3D Text", height = 40, name = "load_button", clicked_fn=self.generateFont)
                     
@@ -113,6 +125,10 @@ class MyExtension(omni.ext.IExt):
                                     CustomFlowSelectionGroup(on_select_fn = self.set_flow_type)
                                     self.flow_density_ui = CustomSliderWidget(min=0.01, max=0.99, num_type = "float", label="Flow density:", default_val=0.2, 
                                         tooltip = "Flow emitter density")
+                                    CustomBoolWidget(label ="Point emitter:", default_value=False, 
+                                        tooltip = "Emit from one point array emitter instead of a prim per emitter.", on_checked_fn = self.set_flow_point_emitter)
+                                    self.flow_max_emitters_ui = CustomSliderWidget(min=16, max=1024, num_type = "int", label="Max emitters:", default_val=256, 
+                                        tooltip = "Upper bound on flow emitters, keeps the scene inside the flow block budget.")
                              
                                     self.flow_radius_ui = CustomSliderWidget(min=1.0, max=10, num_type = "float", label="Flow radius:", default_val=5.0, 
                                         tooltip = "Flow emitter size.")
@@ -130,6 +146,12 @@ class MyExtension(omni.ext.IExt):
 
                                     self.fluid_offset_ui = CustomSliderWidget(min=10, max=100, label="Particle offset:", default_val=40,
                                         tooltip = "Fluid particle offset. Higher value results in lower density.")
+                                    self.fluid_count_ui = CustomSliderWidget(min=0, max=200000, num_type = "int", label="Particle count:", default_val=0,
+                                        tooltip = "Target particle count, the particle offset is derived from the text area. 0 uses the particle offset.")
+                                    self.fluid_seeding_ui = CustomComboboxWidget(label="Seeding:", options=FLUID_SEEDING_MODES,
+                                        tooltip = "Particle placement: square grid, hexagonal packing, Poisson-disk or jittered grid.")
+                                    self.fluid_layers_ui = CustomSliderWidget(min=1, max=64, label="Particle layers:", default_val=1,
+                                        tooltip = "Particle layers through the extrusion depth, one particle diameter apart. 1 fills the front face only.")
                                     self.fluid_radius_ui = CustomSliderWidget(min=1, max=10, label="Particle radius:", default_val=5,
                                         tooltip = "Fluid particle size.")
                                     self.fluid_color_ui = CustomColorWidget(0.774, 0.94, 1.0, label="Fluid color:")
@@ -179,6 +201,7 @@ class MyExtension(omni.ext.IExt):
 
                             CustomPathButtonWidget(label="Font folder:", path=os.path.join(EXTENSION_ROOT, "fonts"))
                             CustomPathButtonWidget(label="Model folder:", path=os.path.join(EXTENSION_ROOT, "model"))
+                            CustomPathButtonWidget(label="Cache folder:", path=GLYPH_CACHE_DIR)
          
     ####################### scene utility #################################################
 
@@ -195,6 +218,12 @@ class MyExtension(omni.ext.IExt):
         # ecologist.
         #     
     
+    def set_export_obj(self, export_obj = True):
+        """
+        Save an .obj file of each generated 3D text
+        """
+        self.export_obj = export_obj
+
     def toggle_eco_mode(self, eco_mode = True):
         """
         Turn on/off eco mode when rendering
@@ -262,6 +291,7 @@ class MyExtension(omni.ext.IExt):
         
         if self.flow_generator:
             self.flow_generator.shutdown()
+        omni.kit.commands.unregister_module_commands(flow_generate)
         
         # if self.mesh_generator: 
         #     self.mesh_generator.shutdown() 
@@ -272,6 +302,10 @@ class MyExtension(omni.ext.IExt):
         # del self.mesh_generator_cache
         self.mesh_generator = None
 
+        shutdown_process_pools()
+        FACE_POOL.clear()
+        PARTICLE_SYSTEMS.clear()
+
     def generateFont(self):
         """
         Generate 3D Text from input
@@ -285,21 +319,59 @@ class MyExtension(omni.ext.IExt):
 
         input_text = self.input_text_ui.model.get_value_as_string()
 
-        mesh_file = os.path.join(EXTENSION_ROOT, "model", f"{input_text}.obj")
         self.mesh_generator = MeshGenerator(font_file, height = font_height, text = input_text, extrude=-font_extrude) 
         self.mesh_generator.generateMesh(create_obj = True)
-        self.mesh_generator.saveMesh(mesh_file)
+        print("glyph cache:", self.mesh_generator.glyph_cache.stats())
+
+        # optional model file
+        if self.export_obj:
+            mesh_file = os.path.join(EXTENSION_ROOT, "model", f"{input_text}.obj")
+            self.mesh_generator.saveMesh(mesh_file)
 
         # load 3d model into the scene
         self.addFont3DModel()
 
+        # the stage owns the mesh now, keep the outlines only
+        self.mesh_generator.mesh = None
+
         # add information to cache
-        self.mesh_generator_cache[input_text] = self.mesh_generator
+        self.cacheMeshGenerator(input_text, self.mesh_generator)
+
+    def cacheMeshGenerator(self, input_text, mesh_generator):
+        """
+        Keep the generator of input_text, bounded to MESH_GENERATOR_CACHE_SIZE entries
+        """
+        self.mesh_generator_cache[input_text] = mesh_generator
+        self.mesh_generator_cache.move_to_end(input_text)
+
+        while len(self.mesh_generator_cache) > MESH_GENERATOR_CACHE_SIZE:
+            _, evicted = self.mesh_generator_cache.popitem(last=False)
+            evicted.shutdown()
+
+    def getMeshGenerator(self, font_prim):
+        """
+        Generator of a font prim, rebuilt (outlines only) from the prim attributes when it was evicted
+        """
+        input_text = font_prim.GetAttribute("font:input_text").Get()
+        mesh_generator = self.mesh_generator_cache.get(input_text)
+
+        if mesh_generator is None:
+            font_file = font_prim.GetAttribute("font:file").Get()
+            if font_file is None:
+                raise Exception(f"No font settings on {font_prim.GetPath()}, generate the 3D text again.")
+
+            mesh_generator = MeshGenerator(font_file, height = font_prim.GetAttribute("font:height").Get(), text = input_text, 
+                extrude = -font_prim.GetAttribute("font:extrude").Get())
+            mesh_generator.generateMesh(create_obj = False)
+
+        self.cacheMeshGenerator(input_text, mesh_generator)
+
+        return mesh_generator
 
 
     def addFont3DModel(self, scale = 10):
         """
-        Load font 3d model into scene
+        Author the font mesh straight into the scene from the mesh generator buffers
         """
         
 
@@ -319,13 +391,15 @@ class MyExtension(omni.ext.IExt):
             )
             font_prim = self.stage.GetPrimAtPath(font_prim_path)
 
-        font_model_path = os.path.join(EXTENSION_ROOT, "model", f"{input_text}.obj")
-        success_bool = font_prim.GetReferences().AddReference(font_model_path)
+        define_font_mesh(self.stage, f"{font_prim_path}/mesh", self.mesh_generator.mesh)
 
         font_prim.GetAttribute("xformOp:scale").Set((scale, scale,  scale))
 
         # add attribute
         font_prim.CreateAttribute("font:input_text",  Sdf.ValueTypeNames.String, False).Set(input_text)
+        font_prim.CreateAttribute("font:file",  Sdf.ValueTypeNames.String, False).Set(self.mesh_generator.fontFile)
+        font_prim.CreateAttribute("font:height",  Sdf.ValueTypeNames.Int, False).Set(self.mesh_generator.height)
+        font_prim.CreateAttribute("font:extrude",  Sdf.ValueTypeNames.Int, False).Set(-self.mesh_generator.extrude)
 
     
     def generateFlow(self):
@@ -337,11 +411,10 @@ class MyExtension(omni.ext.IExt):
 
         # select the correct font prim
         font_prim = self.findFontPrim4Selection()
-        input_text = font_prim.GetAttribute("font:input_text").Get()
         font_prim_path_str = font_prim.GetPath().pathString
 
         # mesh generator
-        self.mesh_generator = self.mesh_generator_cache[input_text]
+        self.mesh_generator = self.getMeshGenerator(font_prim)
 
         # flow generator
         # if not self.flow_generator:
@@ -349,17 +422,18 @@ class MyExtension(omni.ext.IExt):
         
         # set flow type
         self.flow_generator.set_flow_type(self.flow_type)
+        self.flow_generator.set_emitter_mode(self.flow_emitter_mode)
 
         # load flow property
         flow_radius = self.flow_radius_ui.model.get_value_as_float()
         flow_coolingrate = self.flow_coolingrate_ui.model.get_value_as_float()
         flow_density =  self.flow_density_ui.model.get_value_as_float()
-        sample_gap = int(1 / flow_density)
-        # flow_outline_step = self.font_height_ui.model.get_value_as_int()
-        
-        all_points, is_outline = self.mesh_generator.getOutlinePoints(max_step=50)
-        self.flow_generator.setEmitterPositions(all_points)
-        # print("outlinePoints", len(self.flow_generator.emitter_positions), self.flow_generator.emitter_positions[0])
+        flow_max_emitters = self.flow_max_emitters_ui.model.get_value_as_int()
+
+        # emitters evenly spaced along the outlines, capped for the flow block budget
+        emitter_points = self.mesh_generator.getEmitterPoints(spacing=50 / flow_density, max_count=flow_max_emitters)
+        self.flow_generator.setEmitterPositions(emitter_points)
+        print("flow emitters", len(emitter_points))
 
 
         # create xform as root
@@ -372,23 +446,10 @@ class MyExtension(omni.ext.IExt):
                     select_new_prim=False,
                 ) 
 
-        # generate emitters
-        has_emitter = False
-        sample_step = sample_gap
-
-        
+        # generate emitters, one undo step
         begin = time.time()
-        for i in range(len(self.flow_generator.emitter_positions)):
-            if is_outline[i] or sample_step == 0: # is_outline[i] or 
-                pos = self.flow_generator.emitter_positions[i] 
-                self.flow_generator.generateFlowAtPoint(pos + [0.0], flow_path_str = f"{flow_prim_path_str}/Xform_{i}", \
-                    radius = flow_radius, coolingRate=flow_coolingrate, emitter_only=has_emitter)
-                has_emitter = True
-
-                sample_step = sample_gap
-            else:
-                sample_step -= 1
-
+        self.flow_generator.generateFlowAtPoints([pos + [0.0] for pos in self.flow_generator.emitter_positions],
+            flow_path_root=flow_prim_path_str, radius=flow_radius, coolingRate=flow_coolingrate)
         print("time elapse:", time.time() - begin)
 
         # move flow to the correct position
@@ -422,7 +483,6 @@ class MyExtension(omni.ext.IExt):
 
         # select the correct font prim
         font_prim = self.findFontPrim4Selection()
-        input_text = font_prim.GetAttribute("font:input_text").Get()
         font_prim_path_str = font_prim.GetPath().pathString
 
         # create xform as root
@@ -436,7 +496,7 @@ class MyExtension(omni.ext.IExt):
         #         ) 
 
         # mesh generator
-        self.mesh_generator = self.mesh_generator_cache[input_text]
+        self.mesh_generator = self.getMeshGenerator(font_prim)
         
         # property
         fluid_offset = self.fluid_offset_ui.model.get_value_as_int()
@@ -444,10 +504,21 @@ class MyExtension(omni.ext.IExt):
         fluid_colors = [float(s) for s in self.fluid_color_ui.get_color_stringfield().split(",")]
         fluid_color_vec = Gf.Vec3f(*fluid_colors)
 
-        grid_points = self.mesh_generator.getGridPointsInside(grid_size = fluid_offset)
-        print("grid_points", len(grid_points), grid_points)
+        fluid_seeding = FLUID_SEEDING_MODES[self.fluid_seeding_ui.model.get_item_value_model().get_value_as_int()]
+        fluid_layers = self.fluid_layers_ui.model.get_value_as_int()
 
         self.fluid_generator = FluidGenerator(fluid_path_root=fluid_prim_path_str)
+
+        fluid_count = self.fluid_count_ui.model.get_value_as_int()
+        if fluid_count > 0:
+            fluid_offset = self.mesh_generator.getGridSizeForCount(fluid_count, mode = fluid_seeding, 
+                layer_count = fluid_layers, layer_spacing = self.fluid_generator.get_layer_spacing(), default = fluid_offset)
+            print("fluid offset for", fluid_count, "particles:", fluid_offset)
+
+        grid_points = self.mesh_generator.getSeedPointsInVolume(grid_size = fluid_offset, mode = fluid_seeding, 
+            layer_count = fluid_layers, layer_spacing = self.fluid_generator.get_layer_spacing())
+        print("grid_points", len(grid_points), grid_points)
+
         self.fluid_generator.setPartclePositions(grid_points, radius=fluid_radius, color = fluid_color_vec)
 
         # physcial scene
@@ -559,6 +630,12 @@ class MyExtension(omni.ext.IExt):
         """
         self.flow_type = flow_type
 
+    def set_flow_point_emitter(self, point_emitter = True):
+        """
+        Emit flow from one point array emitter instead of a prim per emitter
+        """
+        self.flow_emitter_mode = "point" if point_emitter else "sphere"
+
     def set_up_physical_scene(self, gravityMagnitude = 981):
         # Physics scene
         # _gravityMagnitude = PARTICLE_PROPERTY._gravityMagnitude  # IN CM/s2 - use a lower gravity to avoid fluid compression at 60 FPS
@@ -0,0 +1,273 @@
+# layer level flow authoring, only needs pxr
+import numpy as np
+from pxr import Sdf, Gf, Vt
+
+from .param import FLOW_CONFIG, FLOW_TEMPLATE_ROOT
+
+
+def emitter_attributes(flow_type, radius, layer):
+    """
+    Attributes (name -> (value type, value)) of a flow emitter for flow_type
+    """
+    flow_config = FLOW_CONFIG[flow_type]
+
+    attributes = {
+        "layer": (Sdf.ValueTypeNames.Int, layer),
+        "radius": (Sdf.ValueTypeNames.Float, radius),
+    }
+    for name in ("temperature", "coupleRateTemperature"):
+        if name in flow_config:
+            attributes[name] = (Sdf.ValueTypeNames.Float, flow_config[name])
+    if "velocity" in flow_config:
+        attributes["velocity"] = (Sdf.ValueTypeNames.Float3, Gf.Vec3f(*flow_config["velocity"]))
+
+    return attributes
+
+
+def _set_attribute(prim_spec, name, value_type, value, variability = Sdf.VariabilityVarying):
+    attribute_spec = prim_spec.attributes.get(name)
+    if attribute_spec is None:
+        attribute_spec = Sdf.AttributeSpec(prim_spec, name, value_type, variability, False)
+    attribute_spec.default = value
+
+
+def author_flow_emitters(layer: Sdf.Layer, root_path, points, attributes, start_index = 0, emitter_name = "flowEmitterSphere",
+    emitter_type = "FlowEmitterSphere"):
+    """
+    Author one Xform with a child emitter per point, in a single Sdf.ChangeBlock
+    ::params:
+        layer: edit target layer
+        root_path: parent prim path, emitters go to {root_path}/Xform_{i}
+        points: list of (x, y, z)
+        attributes: emitter attributes, see emitter_attributes
+
+    Returns the created Xform paths.
+    """
+    root_path = Sdf.Path(root_path)
+    paths = []
+
+    with Sdf.ChangeBlock():
+        Sdf.CreatePrimInLayer(layer, root_path)
+
+        for i, point in enumerate(points):
+            xform_path = root_path.AppendChild(f"Xform_{start_index + i}")
+            xform_spec = Sdf.CreatePrimInLayer(layer, xform_path)
+            xform_spec.specifier = Sdf.SpecifierDef
+            xform_spec.typeName = "Xform"
+
+            _set_attribute(xform_spec, "xformOp:translate", Sdf.ValueTypeNames.Double3, Gf.Vec3d(*point))
+            _set_attribute(xform_spec, "xformOpOrder", Sdf.ValueTypeNames.TokenArray, Vt.TokenArray(["xformOp:translate"]),
+                variability=Sdf.VariabilityUniform)
+
+            emitter_spec = Sdf.PrimSpec(xform_spec, emitter_name, Sdf.SpecifierDef, emitter_type) \
+                if emitter_name not in xform_spec.nameChildren else xform_spec.nameChildren[emitter_name]
+            for name, (value_type, value) in attributes.items():
+                _set_attribute(emitter_spec, name, value_type, value)
+
+            paths.append(xform_path)
+
+    return paths
+
+
+def remove_prim_specs(layer: Sdf.Layer, paths):
+    """
+    Remove prim specs (and their children) from the layer in a single Sdf.ChangeBlock
+    """
+    with Sdf.ChangeBlock():
+        for path in paths:
+            path = Sdf.Path(path)
+            prim_spec = layer.GetPrimAtPath(path)
+            if prim_spec is None:
+                continue
+
+            parent = prim_spec.nameParent if prim_spec.nameParent else layer.pseudoRoot
+            del parent.nameChildren[prim_spec.name]
+
+
+def author_flow_point_emitter(layer: Sdf.Layer, emitter_path, points, attributes, emitter_type = "FlowEmitterPoint"):
+    """
+    Author a single point emitter emitting at every point of an array, in one Sdf.ChangeBlock
+    ::params:
+        emitter_path: path of the emitter prim, its parent must exist
+        points: (N, 3) positions in the parent space
+        attributes: emitter attributes, see emitter_attributes (radius is not used by point emitters)
+
+    Emitter count is the array length instead of a prim per point.
+    """
+    emitter_path = Sdf.Path(emitter_path)
+    positions = Vt.Vec3fArray.FromNumpy(np.ascontiguousarray(np.asarray(points, dtype=np.float32).reshape(-1, 3)))
+
+    with Sdf.ChangeBlock():
+        emitter_spec = Sdf.CreatePrimInLayer(layer, emitter_path)
+        emitter_spec.specifier = Sdf.SpecifierDef
+        emitter_spec.typeName = emitter_type
+
+        for name, (value_type, value) in attributes.items():
+            if name != "radius":
+                _set_attribute(emitter_spec, name, value_type, value)
+        _set_attribute(emitter_spec, "pointPositions", Sdf.ValueTypeNames.Float3Array, positions)
+
+    return emitter_path
+
+
+def set_prims_active(layer: Sdf.Layer, paths, active):
+    """
+    Author the active metadata of prims, in a single Sdf.ChangeBlock
+    ::params:
+        active: True or False, or None to clear the opinion again (undo), removing the specs left empty
+    """
+    with Sdf.ChangeBlock():
+        for path in paths:
+            path = Sdf.Path(path)
+            if active is not None:
+                Sdf.CreatePrimInLayer(layer, path).active = active
+                continue
+
+            prim_spec = layer.GetPrimAtPath(path)
+            if prim_spec is None:
+                continue
+            prim_spec.ClearActive()
+
+            # drop the overs only holding the opinion, and their ancestors created along with them
+            while prim_spec is not None and prim_spec != layer.pseudoRoot and prim_spec.IsInert():
+                parent = prim_spec.nameParent if prim_spec.nameParent else layer.pseudoRoot
+                del parent.nameChildren[prim_spec.name]
+                prim_spec = parent
+
+
+# template prim custom data: effect part -> path relative to the template
+TEMPLATE_PARTS = ("emitter", "simulate", "offscreen", "renderer", "advection")
+
+
+def flow_template_path(flow_type):
+    return Sdf.Path(FLOW_TEMPLATE_ROOT).AppendChild(flow_type)
+
+
+def author_flow_preset(stage, flow_type, simulate_path, offscreen_path, advection_path, emitter_path):
+    """
+    Author the FLOW_CONFIG preset of flow_type onto a basic flow effect
+    """
+    flow_config = FLOW_CONFIG[flow_type]
+    simulate_path = Sdf.Path(simulate_path)
+
+    advection = stage.GetPrimAtPath(advection_path)
+    if "buoyancyPerTemp" in flow_config:
+        advection.CreateAttribute("buoyancyPerTemp", Sdf.ValueTypeNames.Float, False).Set(flow_config["buoyancyPerTemp"])
+    if "fuelPerBurn" in flow_config:
+        advection.CreateAttribute("fuelPerBurn", Sdf.ValueTypeNames.Float, False).Set(flow_config["fuelPerBurn"])
+
+    if "fade" in flow_config:
+        smoke = stage.DefinePrim(simulate_path.AppendPath("advection/smoke"), "FlowAdvectionChannelParams")
+        smoke.CreateAttribute("fade", Sdf.ValueTypeNames.Float, False).Set(flow_config["fade"])
+    if "forceScale" in flow_config:
+        vorticity = stage.DefinePrim(simulate_path.AppendChild("vorticity"), "FlowVorticityParams")
+        vorticity.CreateAttribute("forceScale", Sdf.ValueTypeNames.Float, False).Set(flow_config["forceScale"])
+
+    if "rgbaPoints" in flow_config:
+        colormap = stage.DefinePrim(Sdf.Path(offscreen_path).AppendChild("colormap"), "FlowRayMarchColormapParams")
+        colormap.CreateAttribute("rgbaPoints", Sdf.ValueTypeNames.Float4Array, False).Set(
+            Vt.Vec4fArray([Gf.Vec4f(*rgba) for rgba in flow_config["rgbaPoints"]]))
+
+    emitter = stage.GetPrimAtPath(emitter_path)
+    for name, (value_type, value) in emitter_attributes(flow_type, None, FLOW_CONFIG[flow_type]["layer"]).items():
+        if name != "radius":
+            emitter.CreateAttribute(name, value_type, False).Set(value)
+
+
+def author_basic_flow_effect(stage, path, layer):
+    """
+    Minimal flow effect without omni.flowusd: typed emitter, simulate, offscreen and render prims
+    relying on schema defaults, the layout of FlowCreateBasicEffect.
+    Returns effect part (see TEMPLATE_PARTS) -> prim path.
+    """
+    path = Sdf.Path(path)
+    parts = {
+        "emitter": path.AppendChild("flowEmitterSphere"),
+        "simulate": path.AppendChild("flowSimulate"),
+        "offscreen": path.AppendChild("flowOffscreen"),
+        "renderer": path.AppendChild("flowRender"),
+    }
+    parts["advection"] = parts["simulate"].AppendChild("advection")
+
+    prim_types = {"emitter": "FlowEmitterSphere", "simulate": "FlowSimulate", "offscreen": "FlowOffscreen", 
+        "renderer": "FlowRender", "advection": "FlowAdvectionCombustionParams"}
+    for name, prim_path in parts.items():
+        prim = stage.DefinePrim(prim_path, prim_types[name])
+        if name != "advection":
+            prim.CreateAttribute("layer", Sdf.ValueTypeNames.Int, False).Set(layer)
+
+    return parts
+
+
+def author_flow_template(stage, flow_type, create_effect = author_basic_flow_effect):
+    """
+    Template prim of flow_type, authored on first use: effect, FLOW_CONFIG preset, then made a class prim
+    ::params:
+        create_effect: function (stage, path, layer) -> effect part -> prim path, builds the effect at path
+    """
+    template, _ = get_flow_template(stage, flow_type)
+    if template is not None:
+        return template
+
+    # a template missing parts (e.g. its effect undone) is rebuilt from scratch
+    template_path = flow_template_path(flow_type)
+    if stage.GetPrimAtPath(template_path).IsValid():
+        stage.RemovePrim(template_path)
+    stage.DefinePrim(template_path.GetParentPath(), "Scope")
+    stage.DefinePrim(template_path, "Xform")
+
+    parts = create_effect(stage, template_path, FLOW_CONFIG[flow_type]["layer"])
+    author_flow_preset(stage, flow_type, parts["simulate"], parts["offscreen"], parts["advection"], parts["emitter"])
+    finish_flow_template(stage, template_path, parts)
+
+    return stage.GetPrimAtPath(template_path)
+
+
+def finish_flow_template(stage, template_path, parts):
+    """
+    Record where the effect parts live and turn the template into an abstract class prim
+    ::params:
+        parts: effect part (see TEMPLATE_PARTS) -> prim path under template_path
+    """
+    template = stage.GetPrimAtPath(template_path)
+    for name in TEMPLATE_PARTS:
+        template.SetCustomDataByKey(f"flowTemplate:{name}", Sdf.Path(parts[name]).MakeRelativePath(template.GetPath()).pathString)
+
+    template.SetSpecifier(Sdf.SpecifierClass)
+
+
+def get_flow_template(stage, flow_type):
+    """
+    Template prim of flow_type and its part relative paths, None if not authored yet or any part prim is gone
+    """
+    template = stage.GetPrimAtPath(flow_template_path(flow_type))
+    if not template.IsValid() or template.GetSpecifier() != Sdf.SpecifierClass:
+        return None, None
+
+    parts = {name: template.GetCustomDataByKey(f"flowTemplate:{name}") for name in TEMPLATE_PARTS}
+    if any(part is None or not stage.GetPrimAtPath(template.GetPath().AppendPath(part)).IsValid() for part in parts.values()):
+        return None, None
+
+    return template, parts
+
+
+def reference_flow_template(stage, prim_path, flow_type, cooling_rate = None, radius = None):
+    """
+    Make prim_path an instance of the flow_type template through an internal reference,
+    with its own cooling rate and emitter radius. Returns the emitter prim.
+    """
+    template, parts = get_flow_template(stage, flow_type)
+    prim_path = Sdf.Path(prim_path)
+
+    prim = stage.GetPrimAtPath(prim_path)
+    prim.GetReferences().AddInternalReference(template.GetPath())
+
+    if cooling_rate is not None:
+        advection = stage.OverridePrim(prim_path.AppendPath(parts["advection"]))
+        advection.CreateAttribute("coolingRate", Sdf.ValueTypeNames.Float, False).Set(cooling_rate)
+
+    emitter = stage.GetPrimAtPath(prim_path.AppendPath(parts["emitter"]))
+    if radius is not None:
+        emitter.CreateAttribute("radius", Sdf.ValueTypeNames.Float, False).Set(radius)
+
+    return emitter
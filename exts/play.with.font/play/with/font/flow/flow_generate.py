@@ -1,8 +1,77 @@
 import omni
+import omni.kit.commands
+import omni.kit.undo
 import carb
-from pxr import Sdf, Gf, UsdGeom
+from pxr import Sdf
 
 from .param import FLOW_CONFIG
+from .flow_author import author_flow_emitters, author_flow_point_emitter, emitter_attributes, remove_prim_specs, set_prims_active, \
+    author_flow_template, reference_flow_template
+
+
+class CreateFlowEmittersCommand(omni.kit.commands.Command):
+    """
+    Author many emitter Xforms in one Sdf.ChangeBlock, undone as a single step
+    ::params:
+        root_path: parent prim path, emitters go to {root_path}/Xform_{i}
+        points: list of (x, y, z)
+        attributes: emitter attributes, see flow_author.emitter_attributes
+    """
+    def __init__(self, root_path, points, attributes, start_index = 0, usd_context_name = ""):
+        self._root_path = root_path
+        self._points = points
+        self._attributes = attributes
+        self._start_index = start_index
+        self._usd_context_name = usd_context_name
+
+        self._layer = None
+        self._paths = []
+
+    def do(self):
+        stage = omni.usd.get_context(self._usd_context_name).get_stage()
+        self._layer = stage.GetEditTarget().GetLayer()
+        self._paths = author_flow_emitters(self._layer, self._root_path, self._points, self._attributes, start_index=self._start_index)
+
+        return self._paths
+
+    def undo(self):
+        remove_prim_specs(self._layer, self._paths)
+        self._paths = []
+
+
+class CreateFlowPointEmitterCommand(omni.kit.commands.Command):
+    """
+    Author one point emitter holding all emitter positions, optionally
+    deactivating the emitter it replaces. Undone as a single step.
+    ::params:
+        emitter_path: path of the new FlowEmitterPoint
+        points: (N, 3) positions
+        attributes: emitter attributes, see flow_author.emitter_attributes
+        replaced_paths: emitters to deactivate
+    """
+    def __init__(self, emitter_path, points, attributes, replaced_paths = [], usd_context_name = ""):
+        self._emitter_path = emitter_path
+        self._points = points
+        self._attributes = attributes
+        self._replaced_paths = list(replaced_paths)
+        self._usd_context_name = usd_context_name
+
+        self._layer = None
+
+    def do(self):
+        stage = omni.usd.get_context(self._usd_context_name).get_stage()
+        self._layer = stage.GetEditTarget().GetLayer()
+        set_prims_active(self._layer, self._replaced_paths, False)
+
+        return author_flow_point_emitter(self._layer, self._emitter_path, self._points, self._attributes)
+
+    def undo(self):
+        remove_prim_specs(self._layer, [self._emitter_path])
+        set_prims_active(self._layer, self._replaced_paths, None)
+
+
+omni.kit.commands.register_all_commands_in_module(__name__)
+
 
 class FlowGenerator():
     def __init__(self) -> None:
@@ -10,6 +79,10 @@ class FlowGenerator():
         self.flow_type = "Fire"
         self.layer = 1
 
+        # "sphere": an Xform with a FlowEmitterSphere per point
+        # "point": a single FlowEmitterPoint with all positions in an array
+        self.emitter_mode = "sphere"
+
         # stage
         self.stage = omni.usd.get_context().get_stage()
         self.flow_config = FLOW_CONFIG[self.flow_type]
@@ -21,6 +94,9 @@ class FlowGenerator():
         self.flow_config = FLOW_CONFIG[self.flow_type]
         self.layer = self.flow_config["layer"]
 
+    def set_emitter_mode(self, emitter_mode = "sphere"):
+        self.emitter_mode = emitter_mode
+
     def _enable_flowusd_api(self, target_blocks = 32768):
         """
         Enable omni.flowusd api and settings
@@ -48,6 +124,19 @@ class FlowGenerator():
         """ 
         self.emitter_positions = [[p[0] / scale, p[1] / scale] for p in points] 
  
+    def getFlowTemplate(self):
+        """
+        Template prim of the current flow type, the full effect (simulate, offscreen, render
+        and the FLOW_CONFIG preset) is authored once per stage as a class prim
+        """
+        def create_effect(stage, path, layer):
+            successful, (emitter, simulate, offscreen, renderer, advection) = omni.kit.commands.execute("FlowCreateBasicEffect", 
+                path=path.pathString, layer=layer)
+            return {"emitter": emitter.GetPath(), "simulate": simulate.GetPath(), "offscreen": offscreen.GetPath(), 
+                "renderer": renderer.GetPath(), "advection": advection.GetPath()}
+
+        return author_flow_template(self.stage, self.flow_type, create_effect=create_effect)
+
     def generateFlowAtPoint(self, point, flow_path_str = "/World/Xform", radius = 10.0, coolingRate = 1.5, emitter_only = False):
         """
         Generate fire at point with size
@@ -76,81 +165,66 @@ class FlowGenerator():
         # create flow
         path = flow_path_str
       
-        # create flow with emitter
+        # create flow with emitter: an instance of the flow type template
         if not emitter_only:
-            flowSimulate_prim_path = omni.usd.get_stage_next_free_path(self.stage, path + "/flowSimulate", False)
-            flowOffscreen_prim_path = omni.usd.get_stage_next_free_path(self.stage, path + "/flowOffscreen", False)
-            flowRender_prim_path = omni.usd.get_stage_next_free_path(self.stage, path + "/flowRender", False)
-
-           
-            successful, (emitter, simulate, offscreen, renderer, advection) = omni.kit.commands.execute("FlowCreateBasicEffect", path=path, layer=self.layer)
-            # print("successful", successful, emitter.GetPath().pathString)
-            
-            smoke = self.stage.DefinePrim(flowSimulate_prim_path + "/advection/smoke", "FlowAdvectionChannelParams")
-            vorticity = self.stage.DefinePrim(flowSimulate_prim_path + "/vorticity", "FlowVorticityParams")
-            
-            advection.CreateAttribute("coolingRate", Sdf.ValueTypeNames.Float, False).Set(coolingRate)
-        
-            
-            if self.flow_type == "Fire":
-                colormap = self.stage.DefinePrim(flowOffscreen_prim_path + "/colormap", "FlowRayMarchColormapParams")
-
-                if colormap:
-                    rgbaPoints = []
-                    rgbaPoints.append(Gf.Vec4f(0.0154, 0.0177, 0.0154, 0.004902))
-                    rgbaPoints.append(Gf.Vec4f(0.03575, 0.03575, 0.03575, 0.504902))
-                    rgbaPoints.append(Gf.Vec4f(0.03575, 0.03575, 0.03575, 0.504902))
-                    rgbaPoints.append(Gf.Vec4f(1, 0.1594, 0.0134, 0.8))
-                    rgbaPoints.append(Gf.Vec4f(13.53, 2.99, 0.12599, 0.8))
-                    rgbaPoints.append(Gf.Vec4f(78, 39, 6.1, 0.7))
-                    colormap.CreateAttribute("rgbaPoints", Sdf.ValueTypeNames.Float4Array, False).Set(rgbaPoints)
-
-              
-                buoyancyPerTemp = self.flow_config["buoyancyPerTemp"]
-                forceScale = self.flow_config["forceScale"]
-
-                advection.CreateAttribute("buoyancyPerTemp", Sdf.ValueTypeNames.Float, False).Set(buoyancyPerTemp)
-                smoke.CreateAttribute("fade", Sdf.ValueTypeNames.Float, False).Set(2.0)
-                vorticity.CreateAttribute("forceScale", Sdf.ValueTypeNames.Float, False).Set(forceScale)
-
-            elif self.flow_type == "Dust":
-                colormap = self.stage.DefinePrim(flowOffscreen_prim_path + "/colormap", "FlowRayMarchColormapParams")
-
-                if colormap:
-                    rgbaPoints = []
-                    rgbaPoints.append(Gf.Vec4f(0.64, 0.54, 0.32, 0.004902))
-                    rgbaPoints.append(Gf.Vec4f(0.64, 0.54, 0.32, 0.504902))
-                    rgbaPoints.append(Gf.Vec4f(0.64, 0.54, 0.32, 0.504902))
-                    rgbaPoints.append(Gf.Vec4f(0.64, 0.54, 0.32, 0.8))
-                    rgbaPoints.append(Gf.Vec4f(0.64, 0.54, 0.32, 0.8))
-                    rgbaPoints.append(Gf.Vec4f(0.64, 0.54, 0.32, 0.7)) 
-                    colormap.CreateAttribute("rgbaPoints", Sdf.ValueTypeNames.Float4Array, False).Set(rgbaPoints)
-
-                
-            elif self.flow_type == "Smoke":
-                fuelPerBurn = self.flow_config["fuelPerBurn"]
-                advection.CreateAttribute("fuelPerBurn", Sdf.ValueTypeNames.Float, False).Set(fuelPerBurn)
-        
+            self.getFlowTemplate()
+            emitter = reference_flow_template(self.stage, path, self.flow_type, cooling_rate=coolingRate)
 
         else:  # emitter_only == True
             flowEmitterSphere_prim_path = omni.usd.get_stage_next_free_path(self.stage, path + "/flowEmitterSphere", False)
             
             emitter = self.stage.DefinePrim(flowEmitterSphere_prim_path, "FlowEmitterSphere")
             # success, emitter = omni.kit.commands.execute("FlowCreatePrim", prim_path=flowEmitterSphere_prim_path, type_name="FlowEmitterSphere")
-            emitter.CreateAttribute("layer", Sdf.ValueTypeNames.Int, False).Set(self.layer)
-
-        # common property change
-        if self.flow_type == "Fire":
-            emitter.CreateAttribute("temperature", Sdf.ValueTypeNames.Float, False).Set(2.0)
-            emitter.CreateAttribute("coupleRateTemperature", Sdf.ValueTypeNames.Float, False).Set(10.0)
-            emitter.CreateAttribute("velocity", Sdf.ValueTypeNames.Float3, False).Set(Gf.Vec3f(*self.flow_config["velocity"]))
-        elif self.flow_type == "Dust":
-            emitter.CreateAttribute("velocity", Sdf.ValueTypeNames.Float3, False).Set(Gf.Vec3f(*self.flow_config["velocity"]))
 
+            # layer and flow type properties
+            for name, (value_type, value) in emitter_attributes(self.flow_type, radius, self.layer).items():
+                emitter.CreateAttribute(name, value_type, False).Set(value)
 
         #################### flaming font ####################
         emitter.CreateAttribute("radius", Sdf.ValueTypeNames.Float, False).Set(radius)
 
+        return emitter
+
+
+    def generateFlowAtPoints(self, points, flow_path_root = "/World/Flow", radius = 10.0, coolingRate = 1.5):
+        """
+        Generate fire at many points: the first Xform holds the flow effect,
+        the other emitters are authored in one batch. Undone as a single step.
+        ::params:
+            points: list of (x, y, z)
+        """
+        if len(points) == 0:
+            return []
+
+        if self.emitter_mode == "point":
+            return self.generateFlowAtPointArray(points, flow_path_root=flow_path_root, radius=radius, coolingRate=coolingRate)
+
+        with omni.kit.undo.group():
+            self.generateFlowAtPoint(points[0], flow_path_str = f"{flow_path_root}/Xform_0",
+                radius=radius, coolingRate=coolingRate, emitter_only=False)
+
+            _, paths = omni.kit.commands.execute("CreateFlowEmitters", root_path=flow_path_root, points=points[1:],
+                attributes=emitter_attributes(self.flow_type, radius, self.layer), start_index=1)
+
+        return [Sdf.Path(f"{flow_path_root}/Xform_0")] + (paths or [])
+
+    def generateFlowAtPointArray(self, points, flow_path_root = "/World/Flow", radius = 10.0, coolingRate = 1.5):
+        """
+        Generate fire at many points with one effect and one FlowEmitterPoint,
+        the stage grows by the array length instead of a prim per point. Undone as a single step.
+        ::params:
+            points: list of (x, y, z)
+        """
+        flow_path_str = f"{flow_path_root}/Xform_0"
+        with omni.kit.undo.group():
+            emitter = self.generateFlowAtPoint((0.0, 0.0, 0.0), flow_path_str = flow_path_str,
+                radius=radius, coolingRate=coolingRate, emitter_only=False)
+
+            # the point emitter replaces the sphere emitter of the basic effect
+            omni.kit.commands.execute("CreateFlowPointEmitter", emitter_path=f"{flow_path_str}/flowEmitterPoint", points=points,
+                attributes=emitter_attributes(self.flow_type, radius, self.layer), replaced_paths=[emitter.GetPath()])
+
+        return [Sdf.Path(flow_path_str)]
 
     def shutdown(self):
         """
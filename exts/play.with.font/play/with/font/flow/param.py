@@ -5,6 +5,17 @@ FLOW_CONFIG = {
         "velocity": [0, 0 ,0],
         "buoyancyPerTemp": 1.0,
         "forceScale": 3.0,
+        "fade": 2.0,
+        "temperature": 2.0,
+        "coupleRateTemperature": 10.0,
+        "rgbaPoints": [
+            [0.0154, 0.0177, 0.0154, 0.004902],
+            [0.03575, 0.03575, 0.03575, 0.504902],
+            [0.03575, 0.03575, 0.03575, 0.504902],
+            [1, 0.1594, 0.0134, 0.8],
+            [13.53, 2.99, 0.12599, 0.8],
+            [78, 39, 6.1, 0.7],
+        ],
         "layer": 1,
     },
     "Smoke":{
@@ -13,6 +24,17 @@ FLOW_CONFIG = {
     },
     "Dust":{
         "velocity": [0, 0 ,-400],
+        "rgbaPoints": [
+            [0.64, 0.54, 0.32, 0.004902],
+            [0.64, 0.54, 0.32, 0.504902],
+            [0.64, 0.54, 0.32, 0.504902],
+            [0.64, 0.54, 0.32, 0.8],
+            [0.64, 0.54, 0.32, 0.8],
+            [0.64, 0.54, 0.32, 0.7],
+        ],
         "layer": 3,
     }
-}
\ No newline at end of file
+}
+
+# flow presets are authored once per stage as class prims under this scope
+FLOW_TEMPLATE_ROOT = "/World/FlowTemplates"
@@ -2,10 +2,96 @@ import omni
 import carb
 import asyncio
 
+import numpy as np
+
 from pxr import Gf, UsdPhysics, Sdf, Usd, UsdGeom, PhysxSchema, Vt, UsdShade
 from omni.physx.scripts import utils, physicsUtils, particleUtils
 
 from .param import PARTICLE_PROPERTY
+from .fluid_util import particle_positions, isosurface_usage, isosurface_limits
+
+class ParticleSystemManager():
+    """
+    Particle systems shared by the fluid texts of a stage: texts of one color join one particle system
+    (and its isosurface material) as separate particle sets, the GPU simulation is reset once per stage.
+    """
+    def __init__(self) -> None:
+        # color key -> {"path", "usage", "limits"}: particle system path, summed isosurface usage of its particle sets
+        # and the isosurface limits covering it
+        self.systems = {}
+        # color key -> material path
+        self.materials = {}
+        self.gpu_stage = None
+
+    @staticmethod
+    def colorKey(color):
+        return tuple(round(float(c), 3) for c in color)
+
+    def enable_gpu(self, stage):
+        """
+        Switch PhysX to GPU and reset the simulation, once per stage
+        """
+        stage_id = stage.GetRootLayer().identifier
+        if self.gpu_stage == stage_id:
+            return
+
+        from omni.physx import  acquire_physx_interface
+        physx = acquire_physx_interface()
+        physx.overwrite_gpu_setting(1)
+        physx.reset_simulation()
+
+        self.gpu_stage = stage_id
+        self.systems.clear()
+        self.materials.clear()
+
+    def getParticleSystem(self, stage, color):
+        """
+        Particle system path of color on the stage, None when it has to be created
+        """
+        system = self.systems.get(self.colorKey(color))
+        if system is None or not stage.GetPrimAtPath(system["path"]).IsValid():
+            return None
+
+        return system["path"]
+
+    def addParticleSystem(self, color, path):
+        self.systems[self.colorKey(color)] = {"path": path, "usage": {"subgrids": 0, "vertices": 0, "triangles": 0}, "limits": None}
+
+    def addUsage(self, color, usage):
+        """
+        Add the isosurface usage of a particle set, returns the isosurface limits of the whole particle system
+        """
+        system = self.systems[self.colorKey(color)]
+        for name, value in usage.items():
+            system["usage"][name] += value
+        system["limits"] = isosurface_limits(system["usage"])
+
+        return system["limits"]
+
+    def getLimits(self, color):
+        return self.systems[self.colorKey(color)]["limits"]
+
+    def getMaterial(self, stage, color):
+        """
+        Material path of color on the stage, None when it has to be created
+        """
+        path = self.materials.get(self.colorKey(color))
+        if path is None or not stage.GetPrimAtPath(path).IsValid():
+            return None
+
+        return path
+
+    def addMaterial(self, color, path):
+        self.materials[self.colorKey(color)] = path
+
+    def clear(self):
+        self.systems.clear()
+        self.materials.clear()
+        self.gpu_stage = None
+
+
+PARTICLE_SYSTEMS = ParticleSystemManager()
+
 
 class FluidGenerator():
     def __init__(self, fluid_path_root = "/World/fluid3d", flow_type = "Water", layer = 1) -> None:
@@ -21,11 +107,10 @@ class FluidGenerator():
         self.enable_gpu()
 
     def enable_gpu(self):
-        
-        from omni.physx import  acquire_physx_interface
-        physx = acquire_physx_interface()
-        physx.overwrite_gpu_setting(1)
-        physx.reset_simulation()
+        """
+        GPU simulation, reset only when the first fluid of a stage is added
+        """
+        PARTICLE_SYSTEMS.enable_gpu(omni.usd.get_context().get_stage())
 
 
 
@@ -33,11 +118,13 @@ class FluidGenerator():
     def setPartclePositions(self, points, scale = 10, radius = 3.0, max_velocity = 50.0, color = Gf.Vec3f(1.0,0,0)):
         """
         Add particles at points
+        ::params:
+            points: (N, 2) (z = 0) or (N, 3) array in font units, divided by scale
         """
         # stage
         self.stage = omni.usd.get_context().get_stage()
 
-        self.particle_positions = [[p[0] / scale, p[1] / scale, 0] for p in points]
+        self.particle_positions = particle_positions(points, scale)
 
         # for i, point in enumerate(self.particle_positions):
         #     flow_prim = self.stage.GetPrimAtPath(f"/World/x{i}")
@@ -56,8 +143,13 @@ class FluidGenerator():
         # fluid physical scene
         self.set_up_fluid_physical_scene() 
 
-        # fluid root
-        particleSystemStr = omni.usd.get_stage_next_free_path(self.stage, "/World/Fluid", False) # game_prim.GetPath().AppendPath("Fluid").pathString
+        # fluid root, texts of the same color share their particle system
+        self.color = color
+        particleSystemStr = PARTICLE_SYSTEMS.getParticleSystem(self.stage, color)
+        self.shared_particle_system = particleSystemStr is not None
+        if not self.shared_particle_system:
+            particleSystemStr = omni.usd.get_stage_next_free_path(self.stage, "/World/Fluid", False) # game_prim.GetPath().AppendPath("Fluid").pathString
+            PARTICLE_SYSTEMS.addParticleSystem(color, particleSystemStr)
         self.particleSystemPath = Sdf.Path(particleSystemStr)
         self.particleInstanceStr = f"{self.fluid_path_root}" # game_prim.GetPath().AppendPath("Particles").pathString
 
@@ -75,19 +167,15 @@ class FluidGenerator():
         
 
         particleInstancePath = Sdf.Path(self.particleInstanceStr)
-        # paricle instance
-        positions_list = [Gf.Vec3f(*p) for p in self.particle_positions]
-        velocities_list = [Gf.Vec3f(0, 0, 0) for _ in range(len(self.particle_positions))]
-        protoIndices_list = [0 for _ in range(len(self.particle_positions))]
-
-        positions = Vt.Vec3fArray(positions_list)
-        velocities = Vt.Vec3fArray(velocities_list)
+        # paricle instance, one buffer copy per array
+        positions = Vt.Vec3fArray.FromNumpy(self.particle_positions)
+        velocities = Vt.Vec3fArray.FromNumpy(np.zeros_like(self.particle_positions))
         
         particleUtils.add_physx_particleset_pointinstancer(
             stage=self.stage,
             path= particleInstancePath, # 
-            positions=Vt.Vec3fArray(positions),
-            velocities=Vt.Vec3fArray(velocities),
+            positions=positions,
+            velocities=velocities,
             particle_system_path=self.particleSystemPath,
             self_collision=True,
             fluid=True,
@@ -105,13 +193,43 @@ class FluidGenerator():
 
         particlePrototype0_sphere.CreateRadiusAttr(radius)
 
+        # isosurface buffers large enough for all particle sets of the particle system
+        fluidRestOffset = self._particleSystemSchemaParameters["rest_offset"]
+        self.isosurface_usage = isosurface_usage(self.particle_positions, fluidRestOffset * 1.5, fluidRestOffset * 1.6)
+        self.isosurface_limits = PARTICLE_SYSTEMS.addUsage(color, self.isosurface_usage)
+        print("isosurface usage", self.isosurface_usage)
+
         # debug
         # print("sphere_extent_attr", sphere_extent_attr)
         # print("positions_list", len(positions_list), positions_list[:5])
 
+        if self.shared_particle_system:
+            # material and isosurface are already set up (or pending) on the shared particle system
+            self.update_isosurface_limits()
+            return
+
         # enable isosurface
         self.enable_isosurface(max_velocity=max_velocity, color = color)
 
+    def update_isosurface_limits(self):
+        """
+        Raise the isosurface buffers of an already set up particle system to the current limits
+        """
+        particle_system_prim = self._particleSystem.GetPrim()
+        if not particle_system_prim.HasAPI(PhysxSchema.PhysxParticleIsosurfaceAPI):
+            return
+
+        isosurfaceAPI = PhysxSchema.PhysxParticleIsosurfaceAPI(particle_system_prim)
+        isosurfaceAPI.GetMaxVerticesAttr().Set(self.isosurface_limits["max_vertices"])
+        isosurfaceAPI.GetMaxTrianglesAttr().Set(self.isosurface_limits["max_triangles"])
+        isosurfaceAPI.GetMaxSubgridsAttr().Set(self.isosurface_limits["max_subgrids"])
+
+    def get_layer_spacing(self, scale = 10):
+        """
+        Distance between particle layers across the extrusion in font units: one fluid sphere diameter
+        """
+        return PARTICLE_PROPERTY._fluidSphereDiameter * scale
+
     def set_up_fluid_physical_scene(self):
         """
         Fluid / PhysicsScene
@@ -140,56 +258,60 @@ class FluidGenerator():
             print("isosurface settings")
             particle_system = self._particleSystem
             
-            mtl_created = []
-            omni.kit.commands.execute(
-                "CreateAndBindMdlMaterialFromLibrary",
-                mdl_name="OmniSurfacePresets.mdl",
-                mtl_name="OmniSurface_DeepWater",
-                mtl_created_list=mtl_created,
-                select_new_prim=False,
-            )
-
-            self.particle_material_path = mtl_created[0]
-            await omni.kit.app.get_app().next_update_async()
-            selection = omni.usd.get_context().get_selection()
-            selection.set_selected_prim_paths([f"{self.particle_material_path}/Shader"], False)
-            await omni.kit.app.get_app().next_update_async()
-    
-
-            omni.kit.commands.execute('ChangeProperty',
-                prop_path=Sdf.Path(f'{self.particle_material_path}/Shader.inputs:specular_transmission_color'),
-                value=color,
-                prev=Gf.Vec3f(1.0, 1.0, 1.0)
+            # one material per color, reused when a particle system of that color is created again
+            self.particle_material_path = PARTICLE_SYSTEMS.getMaterial(self.stage, color)
+            if self.particle_material_path is None:
+                mtl_created = []
+                omni.kit.commands.execute(
+                    "CreateAndBindMdlMaterialFromLibrary",
+                    mdl_name="OmniSurfacePresets.mdl",
+                    mtl_name="OmniSurface_DeepWater",
+                    mtl_created_list=mtl_created,
+                    select_new_prim=False,
                 )
 
-            await omni.kit.app.get_app().next_update_async()
-            selection = omni.usd.get_context().get_selection()
-            selection.set_selected_prim_paths([f"{self.particle_material_path}/Shader"], False)
-            await omni.kit.app.get_app().next_update_async()
+                self.particle_material_path = mtl_created[0]
+                PARTICLE_SYSTEMS.addMaterial(color, self.particle_material_path)
+                await omni.kit.app.get_app().next_update_async()
+                selection = omni.usd.get_context().get_selection()
+                selection.set_selected_prim_paths([f"{self.particle_material_path}/Shader"], False)
+                await omni.kit.app.get_app().next_update_async()
+        
 
-            omni.kit.commands.execute('ChangeProperty',
-                prop_path=Sdf.Path(f'{self.particle_material_path}/Shader.inputs:specular_transmission_scattering_color'),
-                value=color / 1.35,
-                prev=Gf.Vec3f(1.0, 1.0, 1.0)
+                omni.kit.commands.execute('ChangeProperty',
+                    prop_path=Sdf.Path(f'{self.particle_material_path}/Shader.inputs:specular_transmission_color'),
+                    value=color,
+                    prev=Gf.Vec3f(1.0, 1.0, 1.0)
+                    )
+
+                await omni.kit.app.get_app().next_update_async()
+                selection = omni.usd.get_context().get_selection()
+                selection.set_selected_prim_paths([f"{self.particle_material_path}/Shader"], False)
+                await omni.kit.app.get_app().next_update_async()
+
+                omni.kit.commands.execute('ChangeProperty',
+                    prop_path=Sdf.Path(f'{self.particle_material_path}/Shader.inputs:specular_transmission_scattering_color'),
+                    value=color / 1.35,
+                    prev=Gf.Vec3f(1.0, 1.0, 1.0)
+                    )
+
+                await omni.kit.app.get_app().next_update_async()
+
+                # Create a pbd particle material
+                particleUtils.add_pbd_particle_material(
+                    self.stage,
+                    self.particle_material_path,
+                    cohesion=0.01,
+                    viscosity=0.0091,
+                    surface_tension=0.0074,
+                    friction=0.1,
                 )
 
-            await omni.kit.app.get_app().next_update_async()
-
-            
             omni.kit.commands.execute(
                 "BindMaterial", prim_path=self.particleSystemPath, material_path=self.particle_material_path
             )     
             
-
-            # Create a pbd particle material and set it on the particle system
-            particleUtils.add_pbd_particle_material(
-                self.stage,
-                self.particle_material_path,
-                cohesion=0.01,
-                viscosity=0.0091,
-                surface_tension=0.0074,
-                friction=0.1,
-            )
+            # set the pbd particle material on the particle system
             physicsUtils.add_physics_material_to_prim(self.stage, particle_system.GetPrim(), self.particle_material_path)
 
             # max velocity
@@ -212,11 +334,13 @@ class FluidGenerator():
 
             fluidRestOffset = self._particleSystemSchemaParameters["rest_offset"]
             # apply isosurface params
+            # limits of every particle set joined until now
+            isosurface_limits = PARTICLE_SYSTEMS.getLimits(color)
             isosurfaceAPI = PhysxSchema.PhysxParticleIsosurfaceAPI.Apply(particle_system.GetPrim())
             isosurfaceAPI.CreateIsosurfaceEnabledAttr().Set(True)
-            isosurfaceAPI.CreateMaxVerticesAttr().Set(1024 * 1024)
-            isosurfaceAPI.CreateMaxTrianglesAttr().Set(2 * 1024 * 1024)
-            isosurfaceAPI.CreateMaxSubgridsAttr().Set(1024 * 4)
+            isosurfaceAPI.CreateMaxVerticesAttr().Set(isosurface_limits["max_vertices"])
+            isosurfaceAPI.CreateMaxTrianglesAttr().Set(isosurface_limits["max_triangles"])
+            isosurfaceAPI.CreateMaxSubgridsAttr().Set(isosurface_limits["max_subgrids"])
             isosurfaceAPI.CreateGridSpacingAttr().Set(fluidRestOffset * 1.5)
             isosurfaceAPI.CreateSurfaceDistanceAttr().Set(fluidRestOffset * 1.6)
             isosurfaceAPI.CreateGridFilteringPassesAttr().Set("")
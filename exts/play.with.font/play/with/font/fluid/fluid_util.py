@@ -0,0 +1,96 @@
+# particle array helpers, only need numpy
+import numpy as np
+
+from .param import ISOSURFACE_MAX_VERTICES, ISOSURFACE_MAX_TRIANGLES, ISOSURFACE_MAX_SUBGRIDS, ISOSURFACE_SUBGRID_CELLS, \
+    ISOSURFACE_HEADROOM
+
+
+def particle_positions(points, scale = 10):
+    """
+    (N, 3) contiguous float32 particle positions from (N, 2) (z = 0) or (N, 3) points,
+    ready for Vt.Vec3fArray.FromNumpy
+    """
+    points = np.asarray(points, dtype=np.float32)
+    if len(points) == 0:
+        return np.zeros((0, 3), dtype=np.float32)
+
+    positions = np.zeros((len(points), 3), dtype=np.float32)
+    positions[:, :points.shape[1]] = points
+    positions /= np.float32(scale)
+
+    return positions
+
+
+def _cell_keys(cells, pad = 0):
+    """
+    Integer keys of (N, 3) integer cells, with the key dimensions and the cell origin (pad cells around)
+    """
+    origin = cells.min(axis=0) - pad
+    dims = tuple(cells.max(axis=0) - origin + 1 + pad)
+
+    return np.ravel_multi_index((cells - origin).T, dims), dims, origin
+
+
+def isosurface_usage(positions, grid_spacing, surface_distance, subgrid_cells = ISOSURFACE_SUBGRID_CELLS):
+    """
+    Pre-flight estimate of the isosurface buffers used by particles at their initial positions
+    ::params:
+        positions: (N, 3) particle positions in the particle system space
+        grid_spacing: isosurface grid spacing, surface_distance: isosurface distance to the particles
+
+    Subgrids are the sparse grid blocks touched by any particle surface_distance box, vertices are
+    the grid cells on the boundary of the occupied cells (about one vertex each).
+    Returns a dict of "subgrids", "vertices" and "triangles".
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    if len(positions) == 0:
+        return {"subgrids": 0, "vertices": 0, "triangles": 0}
+
+    # subgrids: every block between the low and high corner of each particle box,
+    # most boxes sit inside one block so only the others are expanded
+    subgrid_size = grid_spacing * subgrid_cells
+    low = np.floor((positions - surface_distance) / subgrid_size).astype(np.int64)
+    high = np.floor((positions + surface_distance) / subgrid_size).astype(np.int64)
+    crossing = np.any(high > low, axis=1)
+    blocks = [low[~crossing]]
+    if np.any(crossing):
+        low, high = low[crossing], high[crossing]
+        span = int((high - low).max()) + 1
+        for offset in np.stack(np.meshgrid(*[np.arange(span)] * 3, indexing="ij"), axis=-1).reshape(-1, 3):
+            blocks.append(np.minimum(low + offset, high))
+    subgrids = len(np.unique(_cell_keys(np.concatenate(blocks))[0]))
+
+    # boundary cells: occupied cells missing one of their 6 neighbors
+    cells = np.floor(positions / grid_spacing).astype(np.int64)
+    keys, dims, origin = _cell_keys(cells, pad=1)
+    keys = np.unique(keys)
+    cells = np.stack(np.unravel_index(keys, dims), axis=-1)
+    boundary = np.zeros(len(keys), dtype=bool)
+    for axis in range(3):
+        for step in (-1, 1):
+            neighbors = cells.copy()
+            neighbors[:, axis] += step
+            neighbor_keys = np.ravel_multi_index(neighbors.T, dims)
+            found = np.minimum(np.searchsorted(keys, neighbor_keys), len(keys) - 1)
+            boundary |= keys[found] != neighbor_keys
+    vertices = int(np.count_nonzero(boundary))
+
+    return {"subgrids": subgrids, "vertices": vertices, "triangles": 2 * vertices}
+
+
+def isosurface_limits(usage, headroom = ISOSURFACE_HEADROOM):
+    """
+    Isosurface buffer limits covering an isosurface_usage estimate with headroom, defaults kept when large enough
+    Raised limits are rounded up to a power of two and reported.
+    Returns a dict of "max_vertices", "max_triangles" and "max_subgrids".
+    """
+    limits = {}
+    for name, default in (("vertices", ISOSURFACE_MAX_VERTICES), ("triangles", ISOSURFACE_MAX_TRIANGLES),
+        ("subgrids", ISOSURFACE_MAX_SUBGRIDS)):
+        needed = usage[name] * headroom
+        limit = default if needed <= default else 1 << int(np.ceil(np.log2(needed)))
+        if limit != default:
+            print(f"[play.with.font] isosurface: about {usage[name]} {name} needed, max {name} raised from {default} to {limit}")
+        limits[f"max_{name}"] = limit
+
+    return limits
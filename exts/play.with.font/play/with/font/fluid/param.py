@@ -46,4 +46,14 @@ class PARTICLE_PROPERTY:
         PARTICLE_PROPERTY._cup_contact_offset = 1.0
         PARTICLE_PROPERTY._cup_mass = 1
 
-        PARTICLE_PROPERTY._gravityMagnitude = 100
\ No newline at end of file
+        PARTICLE_PROPERTY._gravityMagnitude = 100
+
+
+# isosurface buffers of a particle system (PhysxParticleIsosurfaceAPI), raised when a pre-flight estimate exceeds them
+ISOSURFACE_MAX_VERTICES = 1024 * 1024
+ISOSURFACE_MAX_TRIANGLES = 2 * 1024 * 1024
+ISOSURFACE_MAX_SUBGRIDS = 1024 * 4
+# cells per side of a sparse grid subgrid (PhysX default)
+ISOSURFACE_SUBGRID_CELLS = 32
+# room for the fluid to spread out of its initial shape
+ISOSURFACE_HEADROOM = 2.0
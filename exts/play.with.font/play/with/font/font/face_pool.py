@@ -0,0 +1,65 @@
+# shared FreeType faces
+import threading
+from collections import OrderedDict
+
+from freetype import Face
+
+
+class FacePool():
+    def __init__(self, max_faces = 16) -> None:
+        """
+        Lazily opened FreeType faces, one per font file and thread (faces are not thread safe).
+        Each face remembers its char size so set_char_size only runs when the height changes.
+        ::params:
+            max_faces: faces kept per thread, least recently used are closed first
+        """
+        self.max_faces = max_faces
+
+        # FreeType library calls opening or closing faces are not thread safe
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _faces(self):
+        """
+        font file -> [face, height] of the calling thread
+        """
+        faces = getattr(self._local, "faces", None)
+        if faces is None:
+            faces = OrderedDict()
+            self._local.faces = faces
+
+        return faces
+
+    def getFace(self, font_file, height:int):
+        """
+        Face of font_file set to height, opened on first use in this thread
+        """
+        faces = self._faces()
+        entry = faces.get(font_file)
+        if entry is None:
+            with self._lock:
+                entry = [Face(font_file), None]
+                faces[font_file] = entry
+
+                while len(faces) > self.max_faces:
+                    faces.popitem(last=False)
+        else:
+            faces.move_to_end(font_file)
+
+        face, face_height = entry
+        if face_height != height:
+            face.set_char_size(height << 6, height << 6, 96, 96)
+            entry[1] = height
+
+        return face
+
+    def clear(self):
+        """
+        Close the faces of the calling thread
+        """
+        with self._lock:
+            self._faces().clear()
+
+
+# shared by all MeshGenerator instances
+FACE_POOL = FacePool()
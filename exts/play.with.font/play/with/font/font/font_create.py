@@ -1,13 +1,22 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 from freetype import *
 
 from .font_struct import *
 from .font_util import *
+from .glyph_cache import GlyphMesh, GLYPH_CACHE
+from .face_pool import FACE_POOL
+
+
+# worker count -> ProcessPoolExecutor, reused across generations
+_PROCESS_POOLS = {}
 
 
 class MeshGenerator():
     def __init__(self, fontFile, height:int, text:str, 
-        bezierSteps = 3, extrude = 96, bevelRadius = 0, bevelSteps=4) -> None:
+        bezierSteps = 3, extrude = 96, bevelRadius = 0, bevelSteps=4, glyph_cache = None, face_pool = None) -> None:
 
         # properties
         self.fontFile = fontFile
@@ -18,6 +27,12 @@ class MeshGenerator():
         self.bevelRadius = bevelRadius
         self.bevelSteps = bevelSteps
 
+        # glyph tessellation cache, shared across generators by default
+        self.glyph_cache = glyph_cache if glyph_cache is not None else GLYPH_CACHE
+
+        # opened FreeType faces, shared across generators by default
+        self.face_pool = face_pool if face_pool is not None else FACE_POOL
+
         # records
         self.mesh = None
         self.outlines = []
@@ -30,155 +45,412 @@ class MeshGenerator():
         self.polygons = None
         self.offsets = None
 
-    def generateMesh(self, create_obj = True):
+    def openFace(self):
+        """
+        Get the face of this font and height from the face pool
+        """
+        self.face = self.face_pool.getFace(self.fontFile, self.height)
+
+    def generateMesh(self, create_obj = True, workers = None):
         """
         Generate mesh front font data
+        ::params:
+            workers: size of the process pool tessellating the unique glyphs, None or 1 runs in this process
         """
         # init font
-        self.face = Face(self.fontFile)
-        self.face.set_char_size(self.height << 6, self.height << 6, 96, 96)
+        self.openFace()
+
+        # glyphs are laid out independently of their tessellation: build the unique ones first
+        glyphs = self.getGlyphs(dict.fromkeys(self.text), create_obj=create_obj, workers=workers)
 
         # init mesh
         self.mesh = Mesh()
-        self.offset = 0
+        self.layoutText(self.text, glyphs, create_obj=create_obj)
 
-        self.previous = 0
-        for c in self.text:
-            self.AddCharacter(c, create_obj=create_obj)
+        self.face = None
+
+    def generateMeshBatch(self, texts, create_obj = True, merged = False, workers = None):
+        """
+        Generate meshes for many strings sharing this font configuration.
+        The face is opened once and glyphs are shared, so the cost scales with the unique glyphs.
+        ::params:
+            texts: list of strings
+            merged: put all strings in one mesh (each laid out from the origin)
+
+        Returns a list of Mesh, one per string, or (mesh, ranges) when merged where ranges
+        holds (first vertex, vertex count, first index, index count) of each string.
+        The records (outlines, polygons, offsets) describe the last string.
+        """
+        self.openFace()
+
+        glyphs = self.getGlyphs(dict.fromkeys("".join(texts)), create_obj=create_obj, workers=workers)
+
+        meshes = []
+        ranges = []
+        merged_mesh = Mesh() if merged else None
+        for text in texts:
+            self.mesh = merged_mesh if merged else Mesh()
+            vertex_start, index_start = self.mesh.vertexCount, self.mesh.indexCount
+
+            self.layoutText(text, glyphs, create_obj=create_obj)
+
+            if merged:
+                ranges.append((vertex_start, self.mesh.vertexCount - vertex_start, index_start, self.mesh.indexCount - index_start))
+            else:
+                meshes.append(self.mesh)
+
+        self.face = None
+
+        return (merged_mesh, ranges) if merged else meshes
+
+    def generateMeshChunks(self, text = None):
+        """
+        Stream the text mesh glyph by glyph, nothing is accumulated on the generator
+        Yields (positions, normals, indices) per glyph: positions placed along the pen line,
+        indices local to the chunk. Concatenated, the chunks are the mesh of generateMesh.
+        """
+        text = self.text if text is None else text
+
+        offset = 0
+        previous = 0
+        for c in text:
+            # the pooled face may be resized between two chunks
+            self.openFace()
+            if self.face.has_kerning:
+                offset += self.face.get_kerning(previous, c).x
+
+            glyph = self.getGlyph(c, create_obj=True)
+            if len(glyph.indices) > 0:
+                positions = (glyph.positions.astype(np.float64) + [offset, 0.0, 0.0]).astype(np.float32)
+                yield positions, glyph.normals, glyph.indices
+
+            previous = c
+            offset += glyph.advance
 
         self.face = None
 
+    def streamMesh(self, mesh_file, text = None):
+        """
+        Generate and write the mesh glyph by glyph, memory is bounded by one glyph
+        (.ply or .obj; USD needs whole arrays and falls back to generateMesh)
+        Returns (vertex count, face count).
+        """
+        extension = os.path.splitext(mesh_file)[1].lower()
+        if extension == ".ply":
+            counts = write_ply_chunks(mesh_file, self.generateMeshChunks(text))
+        elif extension in (".usd", ".usdc", ".usda"):
+            if text is not None:
+                self.text = text
+            self.generateMesh(create_obj=True)
+            self.mesh.saveUSD(mesh_file)
+            counts = (self.mesh.vertexCount, self.mesh.indexCount // 3)
+        else:
+            counts = write_obj_chunks(mesh_file, self.generateMeshChunks(text))
+
+        return counts
+
+    def layoutText(self, text, glyphs, create_obj = True):
+        """
+        Place the glyphs of text (dict char -> GlyphMesh) along the pen line into self.mesh
+        """
+        self.outlines = []
+        self.polygons = []
+        self.offsets = []
+
+        self.offset = 0
+        self.previous = 0
+        for c in text:
+            self.AddCharacter(c, create_obj=create_obj, glyph=glyphs[c])
+
     def saveMesh(self, mesh_file = "test0.obj"):
-        self.mesh.saveOBJ(mesh_file)
-        print("OBJ mesh save to path:", mesh_file)
+        """
+        Save mesh, format from the file extension: .ply, .usd/.usdc/.usda or .obj
+        """
+        extension = os.path.splitext(mesh_file)[1].lower()
+        if extension == ".ply":
+            self.mesh.savePLY(mesh_file)
+        elif extension in (".usd", ".usdc", ".usda"):
+            self.mesh.saveUSD(mesh_file)
+        else:
+            self.mesh.saveOBJ(mesh_file)
+
+        print("mesh save to path:", mesh_file)
         
-    def AddCharacter(self, c, create_obj = True):
+    def AddCharacter(self, c, create_obj = True, glyph = None):
         """
         Add a single char to mesh
         """
-        self.face.load_char(c)
         if self.face.has_kerning:
             kerning = self.face.get_kerning(self.previous, c)
             self.offset += kerning.x
 
+        if glyph is None:
+            glyph = self.getGlyph(c, create_obj=create_obj)
+
+        for contour in glyph.contours:
+            self.outlines.append(contour + [self.offset, 0])
+
+        for polygon in glyph.shapes:
+            self.polygons.append(polygon)
+            # x axis offset
+            self.offsets.append(self.offset)
+
+        if create_obj and glyph.hasMesh:
+            self.mesh.addMesh(glyph.positions, glyph.normals, glyph.indices, offset=(self.offset, 0.0, 0.0))
+
+        self.previous = c
+        self.offset += glyph.advance
+
+    def glyphSettings(self):
+        return (self.fontFile, self.height, self.bezierSteps, self.extrude, self.bevelRadius, self.bevelSteps)
+
+    def glyphKey(self, c):
+        return (self.fontFile, c, self.height, self.bezierSteps, self.extrude, self.bevelRadius, self.bevelSteps)
+
+    def getGlyphs(self, chars, create_obj = True, workers = None):
+        """
+        Get the tessellated glyphs of chars (dict char -> GlyphMesh),
+        cache misses are built here or across a process pool of `workers`
+        """
+        glyphs = {}
+        missing = []
+        for c in chars:
+            glyph = self.glyph_cache.get(self.glyphKey(c), need_mesh=create_obj)
+            if glyph is None:
+                missing.append(c)
+            else:
+                glyphs[c] = glyph
+
+        if workers is not None and workers > 1 and len(missing) > 1:
+            built = build_glyphs_parallel(self.glyphSettings(), missing, create_obj, workers)
+        else:
+            built = [self.buildGlyph(c, create_obj=create_obj) for c in missing]
+
+        for c, glyph in zip(missing, built):
+            self.glyph_cache.put(self.glyphKey(c), glyph)
+            glyphs[c] = glyph
+
+        return glyphs
+
+    def getGlyph(self, c, create_obj = True):
+        """
+        Get the tessellated glyph of a char from cache, or build it
+        """
+        key = self.glyphKey(c)
+        glyph = self.glyph_cache.get(key, need_mesh=create_obj)
+        if glyph is None:
+            glyph = self.buildGlyph(c, create_obj=create_obj)
+            self.glyph_cache.put(key, glyph)
+
+        return glyph
+
+    def buildGlyph(self, c, create_obj = True):
+        """
+        Vectorise and triangulate a single char in glyph-local coordinates
+        """
+        # pooled faces are shared: make sure ours is at this height
+        self.openFace()
+        self.face.load_char(c)
+
         # outline
         v = Vectoriser(self.face.glyph.outline, self.bezierSteps, reverse=False)
+        contours = [contour.pointList for contour in v.contourList]
+
+        polygons = []
+        cap_triangles = []
         for contour_index in range(len(v.contourList)):
             contour = v.contourList[contour_index]
 
-            self.outlines.append([[e[0] + + self.offset, e[1]] for e in contour.pointList])
-
             if contour.clockwise:
-                outer_contour_points = contour.pointList
-                inner_contour_points_list = []
+                inner_contour_indices = []
                 for other_index in range(len(v.contourList)):
                     other_contour = v.contourList[other_index]
                     if (other_index != contour_index) and (not other_contour.clockwise) and \
                         other_contour.IsInside(contour):
-                            inner_contour_points_list.append(other_contour.pointList)
+                            inner_contour_indices.append(other_index)
 
-                self.polygons.append(Polygon(outer_contour_points, inner_contour_points_list))
-                        # x axis offset
-                self.offsets.append(self.offset)
+                polygons.append([contour_index] + inner_contour_indices)
 
                 if create_obj:
-                    delauney = triangulate_contour(outer_contour_points, inner_contour_points_list)
-                    
-                    for i in range(len(delauney["triangles"])):
-                        triangle_vertex_indices = delauney["triangles"][i]
-                        triangular_vertices = [delauney["vertices"][j] for j in triangle_vertex_indices]
-
-                        v1, v2, v3 = Vertex(), Vertex(), Vertex()
-
-                        v1.x = triangular_vertices[0][0] + self.offset
-                        v1.y = triangular_vertices[0][1]
-                        v1.z = -self.bevelRadius
-
-                        v2.x = triangular_vertices[1][0] + self.offset
-                        v2.y = triangular_vertices[1][1]
-                        v2.z = -self.bevelRadius
-
-                        v3.x = triangular_vertices[2][0] + self.offset
-                        v3.y = triangular_vertices[2][1]
-                        v3.z = -self.bevelRadius
-                        
-                        self.mesh.addTriangle(v1, v2, v3)
-                        
-                        v1, v2, v3 = Vertex(), Vertex(), Vertex()
-                        
-                        v1.x = triangular_vertices[0][0] + self.offset
-                        v1.y = triangular_vertices[0][1]
-                        v1.z = self.bevelRadius + self.extrude
-
-                        v2.x = triangular_vertices[1][0] + self.offset
-                        v2.y = triangular_vertices[1][1]
-                        v2.z = self.bevelRadius + self.extrude
-
-                        v3.x = triangular_vertices[2][0] + self.offset
-                        v3.y = triangular_vertices[2][1]
-                        v3.z = self.bevelRadius + self.extrude
-                        
-                        self.mesh.addTriangle(v3, v2, v1) # pay attention to the order
+                    delauney = triangulate_contour(contour.pointList, [contours[k] for k in inner_contour_indices])
+                    cap_triangles.append(self.capTriangles(delauney["vertices"][delauney["triangles"]]))
 
+        glyph = GlyphMesh(self.face.glyph.advance.x, contours, polygons)
         if create_obj:
-            # bridge 
-            v = Vectoriser(self.face.glyph.outline, self.bezierSteps, reverse=False)
-            for contour in v.contourList:
-                for j in range(len(contour.pointList)):
-                    p1 = contour.pointList[j]
-                    p2 = contour.pointList[(j + 1) % len(contour.pointList)]
-                    # p1 /= 64
-                    # p2 /= 64
-
-                    v1, v2, v3 = Vertex(), Vertex(), Vertex()
-
-                    v1.x = p1[0]+ self.offset
-                    v1.y = p1[1]
-                    v1.z = 0.0
-                    v2.x = p2[0] + self.offset
-                    v2.y = p2[1]
-                    v2.z = 0.0
-                    v3.x = p1[0]+ self.offset
-                    v3.y = p1[1]
-                    v3.z = self.extrude
-                    self.mesh.addTriangle(v1, v2, v3)
-
-                    v1, v2, v3 = Vertex(), Vertex(), Vertex()
-                    v1.x = p1[0] + self.offset
-                    v1.y = p1[1]
-                    v1.z = self.extrude
-                    v2.x = p2[0] + self.offset
-                    v2.y = p2[1]
-                    v2.z = 0.0
-                    v3.x = p2[0] + self.offset
-                    v3.y = p2[1]
-                    v3.z = self.extrude
-                    self.mesh.addTriangle(v1, v2, v3)
-                
-        
-        self.previous = c
-        self.offset += self.face.glyph.advance.x 
+            # caps and bridge of the glyph, each appended in one batch
+            mesh = Mesh()
+            if len(cap_triangles) > 0:
+                mesh.addTriangles(np.concatenate(cap_triangles))
+            if len(contours) > 0:
+                mesh.addTriangles(np.concatenate([self.bridgeTriangles(points) for points in contours]))
+
+            glyph.positions = mesh.positions.copy()
+            glyph.normals = mesh.normals.copy()
+            glyph.indices = mesh.indices.copy()
+
+        return glyph
+
+    def capTriangles(self, triangles_2d):
+        """
+        Front and back cap triangles from (T, 3, 2) triangulated glyph corners
+        """
+        triangles = np.empty((len(triangles_2d), 2, 3, 3))
+        triangles[:, :, :, :2] = triangles_2d[:, None]
+        triangles[:, 0, :, 2] = -self.bevelRadius
+        triangles[:, 1, :, 2] = self.bevelRadius + self.extrude
+        triangles[:, 1] = triangles[:, 1, ::-1] # pay attention to the order
+
+        return triangles.reshape(-1, 3, 3)
+
+    def bridgeTriangles(self, contour_points):
+        """
+        Side wall triangles (two per edge) of a closed contour
+        """
+        p1 = np.asarray(contour_points, dtype=np.float64).reshape(-1, 2)
+        p2 = np.roll(p1, -1, axis=0)
+
+        triangles = np.empty((len(p1), 2, 3, 3))
+        triangles[:, 0, 0, :2] = triangles[:, 0, 2, :2] = triangles[:, 1, 0, :2] = p1
+        triangles[:, 0, 1, :2] = triangles[:, 1, 1, :2] = triangles[:, 1, 2, :2] = p2
+        triangles[:, 0, :, 2] = [0.0, 0.0, self.extrude]
+        triangles[:, 1, :, 2] = [self.extrude, 0.0, self.extrude]
+
+        return triangles.reshape(-1, 3, 3)
 
     ######################################## utils ########################################
     def getOutlinePoints(self, max_step:float = 30):
         """
-        Get outlines (list of points) for the mesh
+        Get outlines points for the mesh: (N, 2) points and (N,) is_outline mask
         """
         return intepolate_outline(self.outlines, max_step=max_step)
 
-    def getGridPointsInside(self, grid_size = 10):
+    def getEmitterPoints(self, count = None, spacing = None, max_count = None, curvature_weight = 0.0):
         """
-        Generate grid points insides the mesh polygons
+        Emitter positions spread evenly by arc length along all outlines of the text
+        ::params:
+            count: exact number of emitters, or
+            spacing: target distance between emitters
+            max_count: cap on the number of emitters (e.g. for a fixed flow block budget)
+            curvature_weight: 0 is pure arc length, larger values favour corners
         """
-        
-        point_list = []
-        for i, polygon in enumerate(self.polygons):
-            points = grid_points_inside_polygon(polygon, grid_size)
-            point_list += [[p[0] + self.offsets[i], p[1]] for p in points]
+        if count is None and spacing:
+            count = int(round(sum(np.linalg.norm(np.roll(o, -1, axis=0) - o, axis=1).sum() for o in self.outlines) / spacing))
+        if max_count is not None and count is not None:
+            count = min(count, max_count)
+
+        return sample_outline_uniform(self.outlines, count=count, curvature_weight=curvature_weight)
+
+    def getGridPointsInside(self, grid_size = 10, rule = "nonzero"):
+        """
+        Generate grid points insides the text outlines, one lattice and one scanline pass for the whole text
+        ::params:
+            rule: fill rule, "nonzero" like FreeType or "evenodd"
+        """
+        return scanline_grid_points(self.outlines, grid_size, rule=rule)
+
+    def getSeedPointsInside(self, grid_size = 10, mode = "grid", rule = "nonzero", seed = None):
+        """
+        Generate particle seed points insides the text outlines
+        ::params:
+            grid_size: spacing of the square lattice, other modes scale it by SEEDING_SPACING[mode]
+            mode: "grid" (square lattice), "hex" (hexagonal lattice), "poisson" (Poisson-disk) or "jitter" (jittered lattice)
+            seed: random seed of the "poisson" and "jitter" modes
+        """
+        spacing = grid_size * SEEDING_SPACING[mode]
+        if mode == "hex":
+            return hex_grid_points(self.outlines, spacing, rule=rule)
+        if mode == "poisson":
+            return poisson_disk_points(self.outlines, spacing, rule=rule, seed=seed)
+        if mode == "jitter":
+            return jittered_grid_points(self.outlines, spacing, rule=rule, seed=seed)
+
+        return scanline_grid_points(self.outlines, grid_size, rule=rule)
+
+    def getInteriorArea(self):
+        """
+        Total area inside the text outlines, holes excluded
+        """
+        return sum(polygon.area for polygon in self.polygons)
+
+    def getGridSizeForCount(self, particle_count, mode = "grid", layer_count = 1, layer_spacing = None, default = None):
+        """
+        Grid size giving about particle_count seed points with getSeedPointsInside / getSeedPointsInVolume,
+        from the interior area and the point density of the seeding mode
+        ::params:
+            layer_count, layer_spacing: layers of getSeedPointsInVolume, the count is shared by the layers fitting in the extrusion
+            default: returned when the text has no interior area (whitespace, glyphs without closed contours)
+        """
+        if particle_count <= 0:
+            raise ValueError(f"particle count {particle_count}")
+
+        area = self.getInteriorArea()
+        if area <= 0:
+            return default
+
+        if layer_spacing is not None:
+            layer_count = fitting_layer_count(layer_count, layer_spacing, self.extrude)
+
+        return float(np.sqrt(SEEDING_DENSITY[mode] * area * max(layer_count, 1) / particle_count))
+
+    def getSeedPointsInVolume(self, grid_size = 10, mode = "grid", layer_count = 1, layer_spacing = None, rule = "nonzero", seed = None):
+        """
+        Generate particle seed points filling the extruded text: the 2D seed points repeated in layers from the front
+        cap through the extrusion depth
+        ::params:
+            layer_count: number of layers, limited to the layers fitting in the extrusion
+            layer_spacing: distance between layers, grid_size by default (see getGridSizeForCount when sizing by count)
+        Returns an (N, 3) array.
+        """
+        points = self.getSeedPointsInside(grid_size, mode=mode, rule=rule, seed=seed)
+
+        return layered_points(points, layer_count, layer_spacing or grid_size, depth=self.extrude)
+
+    def getGridPointsInsidePolygons(self, grid_size = 10):
+        """
+        Generate grid points insides each mesh polygon, on a lattice aligned to each polygon
+        """
+        point_list = [grid_points_inside_polygon(polygon, grid_size) + [self.offsets[i], 0.0] for i, polygon in enumerate(self.polygons)]
+
+        return np.concatenate(point_list) if len(point_list) > 0 else np.empty((0, 2))
+
+
+def _build_glyphs(settings, chars, create_obj):
+    """
+    Process pool task: tessellate chars, faces stay open in the worker's face pool
+    """
+    fontFile, height, bezierSteps, extrude, bevelRadius, bevelSteps = settings
+    generator = MeshGenerator(fontFile, height, "", bezierSteps=bezierSteps, extrude=extrude,
+        bevelRadius=bevelRadius, bevelSteps=bevelSteps)
+
+    return [generator.buildGlyph(c, create_obj=create_obj) for c in chars]
+
+
+def get_process_pool(workers):
+    pool = _PROCESS_POOLS.get(workers)
+    if pool is None:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        _PROCESS_POOLS[workers] = pool
+
+    return pool
+
+
+def shutdown_process_pools():
+    for pool in _PROCESS_POOLS.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    _PROCESS_POOLS.clear()
 
-        return point_list
-        
 
+def build_glyphs_parallel(settings, chars, create_obj, workers):
+    """
+    Tessellate chars across a process pool, returns glyphs in the order of chars
+    """
+    pool = get_process_pool(workers)
+    chunks = [chars[i::workers] for i in range(workers) if i < len(chars)]
+    futures = [pool.submit(_build_glyphs, settings, chunk, create_obj) for chunk in chunks]
 
+    glyphs = [None] * len(chars)
+    for i, future in enumerate(futures):
+        glyphs[i::workers] = future.result()
 
+    return glyphs
 
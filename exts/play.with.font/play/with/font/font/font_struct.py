@@ -1,227 +1,362 @@
 # structures
+import shutil
+import tempfile
+
 import numpy as np
 from freetype import Outline
 
-from .font_util import *
-
 
 FT_Curve_Tag_On = 0x01
 FT_Curve_Tag_Conic = 0x00
 FT_Curve_Tag_Cubic = 0x02
 
+# binary PLY records
+PLY_VERTEX_DTYPE = np.dtype([("position", "<f4", 3), ("normal", "<f4", 3)])
+PLY_FACE_DTYPE = np.dtype([("count", "u1"), ("indices", "<u4", 3)])
+
+
+def flatten_outline(points, tags, contours, bezierSteps):
+    """
+    Flatten a whole FreeType outline in one vectorized pass
+    ::params:
+        points, tags, contours: outline.points, outline.tags, outline.contours
+        bezierSteps: samples per Bezier segment
+
+    Returns the list of (M, 2) point arrays and the list of signed areas, one per contour.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    tags = np.asarray(tags, dtype=np.int64) & 0x03
+    ends = np.asarray(contours, dtype=np.int64).reshape(-1)
+    if len(ends) == 0:
+        return [], []
+
+    # neighbours of every point within its own (closed) contour
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    lengths = ends - starts + 1
+    contour_id = np.repeat(np.arange(len(ends)), lengths)
+    start = starts[contour_id]
+    n = lengths[contour_id]
+    local = np.arange(len(points)) - start
+    prev_index = start + (local - 1) % n
+    next_index = start + (local + 1) % n
+    next2_index = start + (local + 2) % n
+
+    prev, cur, next = points[prev_index], points, points[next_index]
+
+    # signed area: positive is a clockwise contour
+    area = cur[:, 0] * prev[:, 1] - cur[:, 1] * prev[:, 0]
+    signed_areas = np.bincount(contour_id, weights=area, minlength=len(ends))
+
+    # classify segments by tag masks
+    is_on = (n < 2) | (tags == FT_Curve_Tag_On)
+    is_conic = ~is_on & (tags == FT_Curve_Tag_Conic)
+    is_cubic = ~is_on & (tags == FT_Curve_Tag_Cubic) & (tags[next_index] == FT_Curve_Tag_Cubic)
+    prev_conic = is_conic & (tags[prev_index] == FT_Curve_Tag_Conic)
+    next_conic = is_conic & (tags[next_index] == FT_Curve_Tag_Conic)
+
+    # number of emitted points per outline point, and where they start
+    counts = is_on + prev_conic + bezierSteps * (is_conic | is_cubic)
+    offsets = np.cumsum(counts) - counts
+    flat = np.empty((int(counts.sum()), 2))
+
+    flat[offsets[is_on]] = cur[is_on]
+
+    midpoints = (cur + prev) * 0.5
+    flat[offsets[prev_conic]] = midpoints[prev_conic]
+
+    t = (np.arange(bezierSteps) / bezierSteps)[None, :, None]
+    if is_conic.any():
+        A = np.where(prev_conic[:, None], midpoints, prev)[is_conic][:, None, :]
+        B = cur[is_conic][:, None, :]
+        C = np.where(next_conic[:, None], (cur + next) * 0.5, next)[is_conic][:, None, :]
+        U = (1.0 - t) * A + t * B
+        V = (1.0 - t) * B + t * C
+        sample_index = (offsets + prev_conic)[is_conic][:, None] + np.arange(bezierSteps)
+        flat[sample_index] = (1.0 - t) * U + t * V
+
+    if is_cubic.any():
+        A = prev[is_cubic][:, None, :]
+        B = cur[is_cubic][:, None, :]
+        C = next[is_cubic][:, None, :]
+        D = points[next2_index][is_cubic][:, None, :]
+        U = (1.0 - t) * A + t * B
+        V = (1.0 - t) * B + t * C
+        W = (1.0 - t) * C + t * D
+        M = (1.0 - t) * U + t * V
+        N = (1.0 - t) * V + t * W
+        sample_index = offsets[is_cubic][:, None] + np.arange(bezierSteps)
+        flat[sample_index] = (1.0 - t) * M + t * N
+
+    # drop points repeating the first point of their contour, then consecutive repeats
+    flat_contour_id = np.repeat(contour_id, counts)
+    is_first = np.ones(len(flat), dtype=bool)
+    is_first[1:] = flat_contour_id[1:] != flat_contour_id[:-1]
+    first = flat[np.maximum.accumulate(np.where(is_first, np.arange(len(flat)), 0))]
+    keep = is_first | np.any(flat != first, axis=1)
+    flat, flat_contour_id, is_first = flat[keep], flat_contour_id[keep], is_first[keep]
+
+    keep = is_first.copy()
+    keep[1:] |= np.any(flat[1:] != flat[:-1], axis=1)
+    flat, flat_contour_id = flat[keep], flat_contour_id[keep]
+
+    split = np.searchsorted(flat_contour_id, np.arange(1, len(ends)))
+    return np.split(flat, split), signed_areas.tolist()
+
 
 class Vectoriser():
     def __init__(self, outline: Outline, bezierSteps, reverse = False, size_factor = 1.0) -> None:
         self.outline = outline
-        self.ftContourCount = len(outline.contours)
         self.contourFlag = outline.flags
         self.size_factor = size_factor
 
         self.ProcessContours(bezierSteps)
 
     def ProcessContours(self, bezierSteps):
-        contourLength = 0
-        startIndex = 0 
-        endIndex = 0
-
-        self.contourList = [] # list of Contour
-
-        for i in range(self.ftContourCount):
-            endIndex = self.outline.contours[i]
-            contourLength =  (endIndex - startIndex) + 1
-
-            tagList = self.outline.tags[startIndex: (endIndex + 1)]
-            pointList = self.outline.points[startIndex: (endIndex + 1)]
-            
-
-            # new contour
-            contour = Contour(pointList, tagList, contourLength, bezierSteps, self.size_factor)
+        point_lists, signed_areas = flatten_outline(self.outline.points, self.outline.tags, self.outline.contours, bezierSteps)
 
-            self.contourList.append(contour)
-            startIndex = endIndex + 1
+        self.ftContourCount = len(point_lists)
+        self.contourList = [Contour(points, area, self.size_factor) for points, area in zip(point_lists, signed_areas)] # list of Contour
 
 
 class Contour():
-    def __init__(self, contourPoints, tags, n, bezierSteps, size_factor = 1.0) -> None:
+    def __init__(self, pointList, signedArea, size_factor = 1.0) -> None:
         """
-        contour: list of points
+        pointList: (M, 2) array of flattened contour points
+        signedArea: signed area of the original outline contour
         """
-        # variable
-        self.minx = 65000.0
-        self.miny = 65000.0
-        self.maxx = -65000.0
-        self.maxy = -65000.0
-
         self.size_factor = 1.0
 
-        self.pointList = []
-
-        #  Calculate contour direction
-        signedArea = 0.0
-
-        prev = np.array(contourPoints[-1])
-        for i in range(n):
-            cur = np.array(contourPoints[i])
-            area = cur[0] * prev[1] - cur[1] * prev[0]
-            signedArea += area
-
-            prev = cur
+        self.pointList = pointList
 
         # If the final signed area is positive, it's a clockwise contour,
         # otherwise it's anti-clockwise.
         self.clockwise = signedArea > 0.0
 
-        # if embolden contour
-        # if size_factor != 1.0:
-        #     contourPoints = shirnk_contour(contourPoints, step = size_factor - 1.0, is_exterior = self.clockwise)
-        #     # else:
-            #     contourPoints = shirnk_contour(contourPoints, step = 1.0 - size_factor)
-
-        # init
-        prev = None
-        cur, next = np.array(contourPoints[-1]), np.array(contourPoints[0])
-
-        for i in range(n):
-            prev = cur
-            cur = next
-            next = np.array(contourPoints[(i + 1) % n])
+        # bounding box
+        if len(pointList) > 0:
+            self.minx, self.miny = pointList.min(axis=0)
+            self.maxx, self.maxy = pointList.max(axis=0)
+        else:
+            self.minx = self.miny = 65000.0
+            self.maxx = self.maxy = -65000.0
 
-            if n < 2 or (tags[i] & 0x03 == FT_Curve_Tag_On):
-                self.AddPoint(cur)
-
-            elif tags[i] & 0x03 == FT_Curve_Tag_Conic:
-                prev2 = prev
-                next2 = next
-                if tags[(i - 1 + n) % n] & 0x03 == FT_Curve_Tag_Conic:
-                    prev2 = (cur + prev) * 0.5
-                    self.AddPoint(prev2)
-                
-                if tags[(i + 1) % n] & 0x03 == FT_Curve_Tag_Conic:
-                    next2 = (cur + next) * 0.5
-
-                self.evaluateQuadraticCurve(prev2, cur, next2, bezierSteps)
-
-            elif tags[i] & 0x03 == FT_Curve_Tag_Cubic and \
-                 tags[(i + 1) % n] & 0x03 == FT_Curve_Tag_Cubic:
+    def IsInside(self, big):
+        if self.minx > big.minx and self.miny > big.miny \
+            and self.maxx < big.maxx and self.maxy < big.maxy:
+            return True
+        
+        return False
 
-                self.evaluateCubicCurve(prev, cur, next, np.array(contourPoints[(i + 2) % n]), bezierSteps)
+class Mesh():
+    """
+    Triangle mesh stored in contiguous growable buffers:
+    float32 positions and normals (24 bytes per vertex) and uint32 indices
+    """
+    def __init__(self, capacity = 1024) -> None:
+        self._positions = np.empty((capacity, 3), dtype=np.float32)
+        self._normals = np.empty((capacity, 3), dtype=np.float32)
+        self._indices = np.empty(3 * capacity, dtype=np.uint32)
+
+        self.vertexCount = 0
+        self.indexCount = 0
+
+    @property
+    def positions(self):
+        return self._positions[:self.vertexCount]
+
+    @property
+    def normals(self):
+        return self._normals[:self.vertexCount]
+
+    @property
+    def indices(self):
+        """
+        Zero-based triangle indices
+        """
+        return self._indices[:self.indexCount]
 
-      
+    def _reserve(self, vertexCount, indexCount):
+        """
+        Grow the buffers (doubling) to hold at least the given counts
+        """
+        if vertexCount > len(self._positions):
+            capacity = max(vertexCount, 2 * len(self._positions))
+            for name in ("_positions", "_normals"):
+                buffer = np.empty((capacity, 3), dtype=np.float32)
+                buffer[:self.vertexCount] = getattr(self, name)[:self.vertexCount]
+                setattr(self, name, buffer)
+
+        if indexCount > len(self._indices):
+            capacity = max(indexCount, 2 * len(self._indices))
+            buffer = np.empty(capacity, dtype=np.uint32)
+            buffer[:self.indexCount] = self._indices[:self.indexCount]
+            self._indices = buffer
+
+    def addTriangles(self, triangles):
+        """
+        Add a batch of triangles
+        ::params:
+            triangles: (T, 3, 3) array, corners (a, b, c) of each triangle
 
+        Faces are emitted in (c, b, a) order and each corner gets the face normal.
+        Corners with identical (position, normal) are welded within the batch,
+        numbered in order of first appearance. Zero-area triangles have no normal and are dropped.
+        """
+        triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
 
-    def AddPoint(self, point: np.array):
-        if len(self.pointList) == 0 or \
-            (not np.array_equal(point, self.pointList[-1]) and not np.array_equal(point, self.pointList[0])):
-            self.pointList.append(point)
+        a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+        normals = -np.cross(b - a, c - a)
+        norms = np.sqrt(np.sum(normals * normals, axis=1))
+        if not norms.all():
+            triangles, normals, norms = triangles[norms > 0], normals[norms > 0], norms[norms > 0]
+        if len(triangles) == 0:
+            return
 
-        self.minx = min(point[0], self.minx)
-        self.miny = min(point[1], self.miny)
-        self.maxx = max(point[0], self.maxx)
-        self.maxy = max(point[1], self.maxy)
+        normals /= norms[:, None]
 
-    def evaluateQuadraticCurve(self, A,  B,  C, bezierSteps):
-        for i in range(bezierSteps):
-            t = i / bezierSteps
-            U = (1.0 - t) * A + t * B
-            V = (1.0 - t) * B + t * C
+        corners = np.empty((len(triangles), 3, 6), dtype=np.float32)
+        corners[:, :, :3] = triangles[:, ::-1]
+        corners[:, :, 3:] = normals[:, None, :]
+        corners = corners.reshape(-1, 6) + np.float32(0.0) # fold -0.0 into 0.0
 
-            self.AddPoint((1.0 - t) * U + t * V)
+        # weld by the raw bytes of each (position, normal) row
+        keys = np.ascontiguousarray(corners).view(np.dtype((np.void, corners.dtype.itemsize * 6))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
 
-    def evaluateCubicCurve(self, A, B, C, D, bezierSteps):
-        for i in range(bezierSteps):
-            t = i / bezierSteps
-            U = (1.0 - t) * A + t * B
-            V = (1.0 - t) * B + t * C
-            W = (1.0 - t) * C + t * D
+        new_vertices = corners[first[order]]
+        self._reserve(self.vertexCount + len(new_vertices), self.indexCount + len(corners))
 
-            M = (1.0 - t) * U + t * V
-            N = (1.0 - t) * V + t * W
+        self._positions[self.vertexCount:self.vertexCount + len(new_vertices)] = new_vertices[:, :3]
+        self._normals[self.vertexCount:self.vertexCount + len(new_vertices)] = new_vertices[:, 3:]
+        self._indices[self.indexCount:self.indexCount + len(corners)] = rank[inverse.ravel()] + self.vertexCount
 
-            self.AddPoint((1.0 - t) * M + t * N)
+        self.vertexCount += len(new_vertices)
+        self.indexCount += len(corners)
 
-    def IsInside(self, big):
-        if self.minx > big.minx and self.miny > big.miny \
-            and self.maxx < big.maxx and self.maxy < big.maxy:
-            return True
-        
-        return False
+    def addMesh(self, positions, normals, indices, offset = (0.0, 0.0, 0.0)):
+        """
+        Append already welded geometry (zero-based indices), translated by offset
+        """
+        self._reserve(self.vertexCount + len(positions), self.indexCount + len(indices))
 
-    # def change_contour_size(self, contour, size_factor):
-    #     points = np.array(contour)
-    #     polygon = Polygon(points)
-    #     factor = size_factor - 1
-    #     new_polygon = shrink_or_swell_shapely_polygon(polygon, factor = factor)
+        self._positions[self.vertexCount:self.vertexCount + len(positions)] = np.asarray(positions, dtype=np.float64) + offset
+        self._normals[self.vertexCount:self.vertexCount + len(positions)] = normals
+        self._indices[self.indexCount:self.indexCount + len(indices)] = np.asarray(indices, dtype=np.uint32) + np.uint32(self.vertexCount)
 
-    #     return  list(new_polygon.exterior.coords)
-        
-class Vertex():
-    def __init__(self) -> None:
-        self.x = 0
-        self.y = 0
-        self.z = 0
-
-        self.nx = 0
-        self.ny = 0
-        self.nz = 0
-    
-    def __eq__(self, other):
-        return self.x == other.x and self.y == other.y and self.z == other.z \
-            and self.nx == other.nx and self.ny == other.ny and self.nz == other.nz
-    
-    def __sub__(self, other):
-        r = Vertex()
-        r.x = self.x - other.x
-        r.y = self.y - other.y
-        r.z = self.z - other.z
-        return r
-
-    def computeNormal(self, a, b, c):
-        e1 = b - a
-        e2 = c - a
-        self.nx = e1.y * e2.z - e1.z * e2.y
-        self.ny = e1.z * e2.x - e1.x * e2.z
-        self.nz = e1.x * e2.y - e1.y * e2.x
-
-        norm = np.sqrt(self.nx*self.nx + self.ny*self.ny + self.nz*self.nz)
-        self.nx /= norm
-        self.ny /= norm
-        self.nz /= norm
+        self.vertexCount += len(positions)
+        self.indexCount += len(indices)
 
-class Mesh():
-    def __init__(self) -> None:
-        self.vertices = []
-        self.indices = []
+    def addTriangle(self, a, b, c):
+        self.addTriangles(np.array([[a, b, c]], dtype=np.float64))
 
-    def addVertex(self, v: Vertex):
-        for index, item in enumerate(self.vertices):
-            if item == v:
-                return index + 1
+    def print_mesh(self):
+        print("Vertex Count: ", self.vertexCount)
+        print("Index Count: ", self.indexCount)
 
-        self.vertices.append(v)
-        return len(self.vertices)
+    def savePLY(self, file_path, size = 0.01):
+        """
+        Save as little-endian binary PLY (float positions and normals, uint indices)
+        """
+        vertices = np.empty(self.vertexCount, dtype=PLY_VERTEX_DTYPE)
+        vertices["position"] = self.positions * np.float32(size)
+        vertices["normal"] = self.normals
 
-    def addTriangle(self, a:Vertex, b:Vertex, c:Vertex):
-        a.computeNormal(a, b, c)
-        c.nx = b.nx = a.nx
-        c.ny = b.ny = a.ny 
-        c.nz = b.nz = a.nz
+        faces = np.empty(self.indexCount // 3, dtype=PLY_FACE_DTYPE)
+        faces["count"] = 3
+        faces["indices"] = self.indices.reshape(-1, 3)
 
-        self.indices.append(self.addVertex(c))
-        self.indices.append(self.addVertex(b))
-        self.indices.append(self.addVertex(a))
+        with open(file_path, "wb") as f:
+            f.write(ply_header(self.vertexCount, len(faces)))
+            vertices.tofile(f)
+            faces.tofile(f)
 
-    def print_mesh(self):
-        print("Vertex Count: ", len(self.vertices))
-        print("Index Count: ", len(self.indices))
+    def saveUSD(self, file_path, size = 0.01):
+        """
+        Save as a USD layer, crate (binary) format for .usd and .usdc
+        """
+        from .font_usd import save_font_usd
+        save_font_usd(file_path, self, size=size)
 
     def saveOBJ(self, file_path, size = 0.01):
+        positions = (self.positions.astype(np.float64) * size).tolist()
+        faces = (self.indices.reshape(-1, 3).astype(np.int64) + 1).tolist()
         with open(file_path, "w") as f:
-            for i in range(len(self.vertices)):
-                f.write(f"v {self.vertices[i].x * size} {self.vertices[i].y * size} {self.vertices[i].z * size}\n")
-
-            for i in range(len(self.indices) // 3):
-                f.write(f"f {self.indices[3 * i]} {self.indices[3 * i + 1]} {self.indices[3 * i + 2]}\n")
-
-
-
-        
\ No newline at end of file
+            f.writelines(f"v {x} {y} {z}\n" for x, y, z in positions)
+            f.writelines(f"f {i} {j} {k}\n" for i, j, k in faces)
+
+
+def ply_header(vertex_count, face_count, count_width = 0):
+    """
+    Binary PLY header, counts padded to count_width so the header can be rewritten in place
+    """
+    return "\n".join([
+        "ply",
+        "format binary_little_endian 1.0",
+        f"element vertex {vertex_count:<{count_width}}",
+        "property float x", "property float y", "property float z",
+        "property float nx", "property float ny", "property float nz",
+        f"element face {face_count:<{count_width}}",
+        "property list uchar uint vertex_indices",
+        "end_header\n",
+    ]).encode("ascii")
+
+
+def write_ply_chunks(file_path, chunks, size = 0.01):
+    """
+    Stream mesh chunks to a binary PLY, one chunk in memory at a time
+    ::params:
+        chunks: iterable of (positions, normals, indices), indices local to their chunk
+
+    Vertices go straight to the file and faces to a spool file appended at the end,
+    the header is written first with padded counts and patched once the counts are known.
+    Returns (vertex count, face count).
+    """
+    vertex_count = face_count = 0
+    with open(file_path, "wb") as f, tempfile.TemporaryFile() as face_file:
+        f.write(ply_header(0, 0, count_width=10))
+
+        for positions, normals, indices in chunks:
+            vertices = np.empty(len(positions), dtype=PLY_VERTEX_DTYPE)
+            vertices["position"] = positions * np.float32(size)
+            vertices["normal"] = normals
+            vertices.tofile(f)
+
+            faces = np.empty(len(indices) // 3, dtype=PLY_FACE_DTYPE)
+            faces["count"] = 3
+            faces["indices"] = np.asarray(indices, dtype=np.uint32).reshape(-1, 3) + np.uint32(vertex_count)
+            faces.tofile(face_file)
+
+            vertex_count += len(positions)
+            face_count += len(faces)
+
+        face_file.seek(0)
+        shutil.copyfileobj(face_file, f)
+
+        f.seek(0)
+        f.write(ply_header(vertex_count, face_count, count_width=10))
+
+    return vertex_count, face_count
+
+
+def write_obj_chunks(file_path, chunks, size = 0.01):
+    """
+    Stream mesh chunks to an OBJ, each chunk's vertices followed by its faces
+    ::params:
+        chunks: iterable of (positions, normals, indices), indices local to their chunk
+
+    Returns (vertex count, face count).
+    """
+    vertex_count = face_count = 0
+    with open(file_path, "w") as f:
+        for positions, normals, indices in chunks:
+            faces = (np.asarray(indices, dtype=np.int64).reshape(-1, 3) + vertex_count + 1).tolist()
+            f.writelines(f"v {x} {y} {z}\n" for x, y, z in (np.asarray(positions, dtype=np.float64) * size).tolist())
+            f.writelines(f"f {i} {j} {k}\n" for i, j, k in faces)
+
+            vertex_count += len(positions)
+            face_count += len(faces)
+
+    return vertex_count, face_count
@@ -0,0 +1,43 @@
+# usd authoring, only needs pxr
+import numpy as np
+from pxr import Usd, UsdGeom, Vt, Sdf
+
+
+def define_font_mesh(stage, prim_path, mesh, size = 0.01):
+    """
+    Author a UsdGeom.Mesh from the Mesh buffers, one Vt array assignment per attribute
+    """
+    points = mesh.positions * np.float32(size)
+    face_count = mesh.indexCount // 3
+
+    usd_mesh = UsdGeom.Mesh.Define(stage, prim_path)
+    usd_mesh.CreatePointsAttr().Set(Vt.Vec3fArray.FromNumpy(points))
+    usd_mesh.CreateFaceVertexCountsAttr().Set(Vt.IntArray.FromNumpy(np.full(face_count, 3, dtype=np.int32)))
+    usd_mesh.CreateFaceVertexIndicesAttr().Set(Vt.IntArray.FromNumpy(mesh.indices.astype(np.int32)))
+    usd_mesh.CreateNormalsAttr().Set(Vt.Vec3fArray.FromNumpy(mesh.normals))
+    usd_mesh.SetNormalsInterpolation(UsdGeom.Tokens.vertex)
+    usd_mesh.CreateSubdivisionSchemeAttr().Set(UsdGeom.Tokens.none)
+
+    if len(points) > 0:
+        usd_mesh.CreateExtentAttr().Set(Vt.Vec3fArray.FromNumpy(np.stack([points.min(axis=0), points.max(axis=0)])))
+
+    return usd_mesh
+
+
+def save_font_usd(file_path, mesh, size = 0.01):
+    """
+    Write the mesh to a USD file (crate for .usd/.usdc), default prim /Font with a mesh child
+    """
+    stage = Usd.Stage.CreateInMemory()
+    UsdGeom.SetStageUpAxis(stage, UsdGeom.Tokens.y)
+
+    root = UsdGeom.Xform.Define(stage, "/Font")
+    stage.SetDefaultPrim(root.GetPrim())
+    define_font_mesh(stage, "/Font/mesh", mesh, size=size)
+
+    stage.GetRootLayer().Export(file_path)
+
+    # stages referencing an older version of the file pick up the new one
+    layer = Sdf.Layer.Find(file_path)
+    if layer:
+        layer.Reload()
@@ -1,5 +1,5 @@
 # util
-from shapely import geometry
+import shapely
 from shapely.geometry import Polygon, Point
 from shapely.prepared import prep
 
@@ -45,60 +45,465 @@ def triangulate_contour(outer_contour_points, inner_contour_points_list):
 def intepolate_outline(outlines: list, max_step: float = 30):
     """
     Intepolate outline by a maximum step:
+    every closed edge p1 -> p2 is split into the fewest n pieces shorter than max_step
+    Returns the (N, 2) points and the (N,) is_outline mask (True at the original vertices)
     """
-    is_outline_list = []
-    point_list = []
-    for outline in outlines:
-        for i in range(len(outline)):
-            p1 = outline[i]
-            p2 = outline[(i + 1) % len(outline)]
+    outlines = [np.asarray(outline, dtype=np.float64).reshape(-1, 2) for outline in outlines if len(outline) > 0]
+    if len(outlines) == 0:
+        return np.empty((0, 2)), np.empty(0, dtype=bool)
 
-            outline_points = intepolate_two_points(p1, p2, max_step)
+    p1 = np.concatenate(outlines)
+    p2 = np.concatenate([np.roll(outline, -1, axis=0) for outline in outlines])
 
-            point_list.extend(outline_points)
-            is_outline_list.extend([True] + [False] * (len(outline_points) - 1))
+    n = intepolate_counts(np.linalg.norm(p1 - p2, axis=1), max_step)
+
+    # one row per output point: its edge and its step i in 0..n-1
+    edge = np.repeat(np.arange(len(n)), n)
+    first = np.cumsum(n) - n
+    i = np.arange(len(edge)) - first[edge]
+
+    t = (i / n[edge])[:, None]
+    point_list = (1 - t) * p1[edge] + t * p2[edge]
+
+    is_outline_list = np.zeros(len(edge), dtype=bool)
+    is_outline_list[first] = True
 
     return point_list, is_outline_list
 
+def intepolate_counts(distances, max_step: float):
+    """
+    Smallest n >= 1 with distance / n < max_step, for every distance
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    n = np.maximum(np.floor(distances / max_step).astype(np.int64) + 1, 1)
+
+    # floating point correction against the exact test
+    while True:
+        low = distances / n >= max_step
+        if not low.any():
+            break
+        n[low] += 1
+
+    while True:
+        high = (n > 1) & (distances / np.maximum(n - 1, 1) < max_step)
+        if not high.any():
+            break
+        n[high] -= 1
+
+    return n
+
 def intepolate_two_points(p1, p2, max_step: float):
     """
     Intepolate two points by a maximum step:
     """
-    point1 = np.array(p1)
-    point2 = np.array(p2)
+    point1 = np.array(p1, dtype=np.float64)
+    point2 = np.array(p2, dtype=np.float64)
 
-    n = 1
-    while np.linalg.norm(point1 - point2) / n >= max_step:
-        n += 1
+    n = int(intepolate_counts([np.linalg.norm(point1 - point2)], max_step)[0])
+    t = (np.arange(n) / n)[:, None]
 
-    point_list = []
-    for i in range(n):
-        p = (1 - i / n) * point1 + (i / n) * point2
-        point_list.append(p.tolist())
-
-    return point_list
+    return ((1 - t) * point1 + t * point2).tolist()
 
     
 def grid_points_inside_polygon(polygon: Polygon, grid_size: int):
     """
     Generate points inside the polygon
+    Returns an (N, 2) array of the lattice points covered by the polygon
     """
     latmin, lonmin, latmax, lonmax = polygon.bounds
-    
-    # resolution_lat = int((latmax - latmin) / grid_size)
-    # resolution_lon = int((lonmax - lonmin) / grid_size)
-    # print("resolution_lat", resolution_lat, resolution_lon)
-    # create prepared polygon
-    prep_polygon = prep(polygon)
-
-    # construct a rectangular mesh
-    points = []
-    
-    for lat in range(int(latmin), int(latmax) + grid_size, grid_size):
-        for lon in range(int(lonmin), int(lonmax), grid_size):
-            points.append(Point((round(lat,4), round(lon,4))))
-    
-    filtered_points = [(p.x, p.y) for p in filter(prep_polygon.covers, points)]
-    # print("len filtered_points", len(filtered_points))
 
-    return filtered_points
\ No newline at end of file
+    # construct a rectangular mesh, x major like the original nested loops
+    lats = np.arange(int(latmin), int(latmax) + grid_size, grid_size, dtype=np.float64)
+    lons = np.arange(int(lonmin), int(lonmax), grid_size, dtype=np.float64)
+    points = np.empty((len(lats), len(lons), 2))
+    points[:, :, 0] = lats[:, None]
+    points[:, :, 1] = lons[None, :]
+    points = points.reshape(-1, 2)
+
+    if len(points) == 0:
+        return points
+
+    if hasattr(shapely, "covers"):
+        # shapely 2: classify the whole lattice in one call
+        shapely.prepare(polygon)
+        inside = shapely.covers(polygon, shapely.points(points))
+    else:
+        prep_polygon = prep(polygon)
+        inside = np.array([prep_polygon.covers(Point(p)) for p in points], dtype=bool)
+
+    return points[inside]
+
+
+def scanline_grid_points(contours: list, grid_size: int, rule: str = "nonzero", row_size: float = None, odd_row_shift: float = 0.0):
+    """
+    Lattice points inside closed contours, one scanline pass over all of them
+    ::params:
+        contours: list of (M, 2) contour points, any orientation
+        grid_size: lattice spacing, the lattice starts at the truncated bounds minimum
+        rule: "nonzero" (TrueType/FreeType default) or "evenodd" fill
+        row_size: distance between rows, grid_size by default
+        odd_row_shift: x shift of every other row (grid_size / 2 with a row_size of grid_size * sqrt(3) / 2 is a hex lattice)
+
+    Returns an (N, 2) array ordered by row then x, the same points as points_inside_contours on the lattice.
+    """
+    contours = [np.asarray(c, dtype=np.float64).reshape(-1, 2) for c in contours if len(c) > 2]
+    if len(contours) == 0:
+        return np.empty((0, 2))
+
+    # edge table: every contour edge with its winding direction
+    p1 = np.concatenate(contours)
+    p2 = np.concatenate([np.roll(c, -1, axis=0) for c in contours])
+    x0, y0 = int(p1[:, 0].min()), int(p1[:, 1].min())
+    row_size = row_size or grid_size
+    row_count = max(int(np.ceil((int(p1[:, 1].max()) - y0) / row_size)), 0)
+
+    # rows crossed by each edge, half open in y so shared vertices cross once,
+    # searched on the row coordinates themselves so rounding cannot move an edge end across a row
+    row_y = y0 + np.arange(row_count) * row_size
+    ylo, yhi = np.minimum(p1[:, 1], p2[:, 1]), np.maximum(p1[:, 1], p2[:, 1])
+    first_row = np.searchsorted(row_y, ylo, side="left")
+    end_row = np.searchsorted(row_y, yhi, side="left")
+    counts = np.maximum(end_row - first_row, 0)
+
+    # active edges of every row: one crossing per (edge, row)
+    edge = np.repeat(np.arange(len(p1)), counts)
+    row = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + first_row[edge]
+    y = row_y[row]
+    t = (y - p1[edge, 1]) / (p2[edge, 1] - p1[edge, 1])
+    x = p1[edge, 0] + t * (p2[edge, 0] - p1[edge, 0])
+    direction = np.where(p2[edge, 1] > p1[edge, 1], 1, -1)
+
+    order = np.lexsort((x, row))
+    x, row, direction = x[order], row[order], direction[order]
+
+    # winding number right after each crossing, rows always close back to zero
+    winding = np.cumsum(direction)
+    inside = winding != 0 if rule == "nonzero" else winding % 2 == 1
+    was_inside = np.concatenate([[False], inside[:-1]])
+
+    # merged spans: enter where the fill turns on, leave where it turns off
+    span_begin = x[inside & ~was_inside]
+    span_end = x[~inside & was_inside]
+    span_row = row[inside & ~was_inside]
+
+    # spans are half open in x like the winding test of points_inside_contours (crossings with x > point),
+    # so a lattice point on an edge is inside on the left side of a span and outside on its right side
+    span_x0 = x0 + odd_row_shift * (span_row % 2)
+    first_column = first_column_at_or_after(span_begin, span_x0, grid_size)
+    end_column = first_column_at_or_after(span_end, span_x0, grid_size)
+    column_counts = np.maximum(end_column - first_column, 0)
+
+    column = np.arange(column_counts.sum()) - np.repeat(np.cumsum(column_counts) - column_counts, column_counts) \
+        + np.repeat(first_column, column_counts)
+
+    points = np.empty((len(column), 2))
+    points[:, 0] = np.repeat(span_x0, column_counts) + column * grid_size
+    points[:, 1] = row_y[np.repeat(span_row, column_counts)]
+
+    return points
+
+
+def first_column_at_or_after(x, x0, grid_size):
+    """
+    Smallest column c with x0 + c * grid_size >= x, checked on the lattice coordinates against rounding
+    """
+    column = np.ceil((x - x0) / grid_size).astype(np.int64)
+    column += x0 + column * grid_size < x
+    column -= x0 + (column - 1) * grid_size >= x
+
+    return column
+
+
+# seeding mode -> spacing of its points relative to the square lattice grid_size (bench_seeding.py,
+# 'Hello' and 'Omniverse' at height 52, grid 20-80):
+# - hex: sqrt(3/2) keeps the covering radius of the square lattice, so away from the outline the
+#   largest gap is the same with 20-25% fewer points. Where rows are cut by the glyph edges the
+#   gaps are wider: over the whole text the 99th percentile gap is 5-10% larger than the grid's.
+# - poisson: not a savings mode, the irregular points need 15-20% more points than the square
+#   lattice for the same 99th percentile gap (0.75).
+# - jitter: the lattice count, gaps about 10% wider.
+SEEDING_SPACING = {"grid": 1.0, "hex": float(np.sqrt(1.5)), "poisson": 0.75, "jitter": 1.0}
+
+# seeding mode -> points per grid_size ** 2 of area, the hex lattice exactly, the others measured
+# (jittered points falling outside are dropped)
+SEEDING_DENSITY = {"grid": 1.0, "hex": float(2 / (np.sqrt(3) * SEEDING_SPACING["hex"] ** 2)), "poisson": 1.15, "jitter": 0.99}
+
+
+def contour_edges(contours: list):
+    """
+    (p1, p2) start and end points of every edge of the closed contours with more than two points
+    """
+    contours = [np.asarray(c, dtype=np.float64).reshape(-1, 2) for c in contours if len(c) > 2]
+    if len(contours) == 0:
+        return np.empty((0, 2)), np.empty((0, 2))
+
+    return np.concatenate(contours), np.concatenate([np.roll(c, -1, axis=0) for c in contours])
+
+
+def points_inside_contours(contours: list, points, rule: str = "nonzero", chunk_size: int = 1 << 22, edges = None):
+    """
+    Vectorized winding number test of points against closed contours
+    ::params:
+        contours: list of (M, 2) contour points, any orientation
+        points: (N, 2) query points
+        rule: "nonzero" or "evenodd" fill
+        chunk_size: bound on the (points x edges) work arrays
+        edges: contour_edges(contours), for repeated tests against the same contours
+
+    Points are sorted by y and tested in chunks against the edges spanning the chunk rows only.
+    Returns a bool (N,) array.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    inside = np.zeros(len(points), dtype=bool)
+    p1, p2 = edges if edges is not None else contour_edges(contours)
+    if len(p1) == 0 or len(points) == 0:
+        return inside
+
+    ylo, yhi = np.minimum(p1[:, 1], p2[:, 1]), np.maximum(p1[:, 1], p2[:, 1])
+    direction = np.where(p2[:, 1] > p1[:, 1], 1, -1)
+
+    order = np.argsort(points[:, 1], kind="stable")
+    sorted_points = points[order]
+    # small chunks span narrow y bands, with fewer edges to test
+    step = min(max(chunk_size // len(p1), 1), 256)
+    for begin in range(0, len(points), step):
+        chunk = sorted_points[begin:begin + step]
+        edges = np.flatnonzero((ylo <= chunk[-1, 1]) & (yhi > chunk[0, 1]))
+        if len(edges) == 0:
+            continue
+
+        px, py = chunk[:, 0:1], chunk[:, 1:2]
+        a, b = p1[edges], p2[edges]
+        # crossings of the ray to +x, half open in y like the scanline fill
+        crossing = (ylo[edges] <= py) & (py < yhi[edges])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = a[:, 0] + (py - a[:, 1]) / (b[:, 1] - a[:, 1]) * (b[:, 0] - a[:, 0])
+        winding = np.sum(np.where(crossing & (x > px), direction[edges], 0), axis=1)
+
+        inside[order[begin:begin + step]] = winding != 0 if rule == "nonzero" else winding % 2 == 1
+
+    return inside
+
+
+def hex_grid_points(contours: list, grid_size: float, rule: str = "nonzero"):
+    """
+    Hexagonal lattice points inside closed contours: rows grid_size * sqrt(3) / 2 apart, odd rows shifted by half a column
+    """
+    return scanline_grid_points(contours, grid_size, rule=rule, row_size=grid_size * np.sqrt(3) / 2, odd_row_shift=grid_size / 2)
+
+
+def jittered_grid_points(contours: list, grid_size: float, jitter: float = 0.5, rule: str = "nonzero", seed: int = None):
+    """
+    Square lattice points inside closed contours, each moved by up to jitter * grid_size / 2 along x and y
+    Points jittered outside of the contours are dropped.
+    """
+    points = scanline_grid_points(contours, grid_size, rule=rule)
+    rng = np.random.default_rng(seed)
+    points = points + rng.uniform(-0.5, 0.5, points.shape) * jitter * grid_size
+
+    return points[points_inside_contours(contours, points, rule=rule)]
+
+
+def poisson_disk_points(contours: list, radius: float, rule: str = "nonzero", attempts: int = 30, seed: int = None):
+    """
+    Poisson-disk sampling inside closed contours (parallel dart throwing), no two points closer than radius
+    ::params:
+        radius: minimum distance between points
+        attempts: candidates drawn in an empty cell before it is given up
+
+    A background grid of radius / sqrt(2) cells holds at most one point each, the cells touching the
+    interior are found once. Cells are visited in 9 phases by (column % 3, row % 3): cells of one phase
+    are more than radius apart, so all of them draw a candidate at once and each candidate is only
+    compared with the accepted points of its 5 x 5 cell neighbourhood. Empty cells whose probes are all
+    covered by their neighbours' disks or outside the contours are retired.
+    Returns an (N, 2) array.
+    """
+    contours = [np.asarray(c, dtype=np.float64).reshape(-1, 2) for c in contours if len(c) > 2]
+    if len(contours) == 0:
+        return np.empty((0, 2))
+
+    rng = np.random.default_rng(seed)
+    bounds_min = np.min([c.min(axis=0) for c in contours], axis=0)
+    bounds_max = np.max([c.max(axis=0) for c in contours], axis=0)
+
+    cell = radius / np.sqrt(2)
+    pad = 2
+    columns, rows = np.ceil((bounds_max - bounds_min) / cell).astype(np.int64) + 1 + 2 * pad
+
+    def cell_of(p):
+        """
+        Flat (column, row) cell index of points
+        """
+        c = np.floor((p - bounds_min) / cell).astype(np.int64) + pad
+        return c[:, 0] * rows + c[:, 1]
+
+    def cell_corner(c):
+        return bounds_min + (np.stack([c // rows, c % rows], axis=-1) - pad) * cell
+
+    # occupancy: cell -> index of its point, -1 when empty
+    grid = np.full(columns * rows, -1, dtype=np.int64)
+    points = np.empty((grid.size, 2))
+    count = 0
+
+    # cells touching the interior, from a half cell lattice
+    interior = np.zeros(grid.size, dtype=bool)
+    interior[cell_of(scanline_grid_points(contours, cell / 2, rule=rule))] = True
+    # cells an edge runs through (and their neighbours) need the inside test, the others are inside
+    on_edge = np.zeros(grid.size, dtype=bool)
+    edge_cells = cell_of(intepolate_outline(contours, max_step=cell / 2)[0])
+    for offset in (-rows - 1, -rows, -rows + 1, -1, 0, 1, rows - 1, rows, rows + 1):
+        on_edge[edge_cells + offset] = True
+
+    # 5 x 5 neighbourhood without its corners, the cells a point closer than radius can be in
+    window = np.stack(np.meshgrid(np.arange(-2, 3), np.arange(-2, 3), indexing="ij"), axis=-1).reshape(-1, 2)
+    window = window[np.any(np.abs(window) < 2, axis=1)]
+    window = window[:, 0] * rows + window[:, 1]
+
+    # sub-cell probes of the coverage test
+    probes = (np.stack(np.meshgrid(np.arange(3), np.arange(3), indexing="ij"), axis=-1).reshape(-1, 2) + 0.5) * (cell / 3)
+
+    def covered(c, samples):
+        """
+        Bool (len(c), S) array: samples (len(c), S, 2) within radius of an accepted point around their cell
+        """
+        neighbors = grid[c[:, None] + window]
+        pair, slot = np.nonzero(neighbors >= 0)
+        squared = np.sum((samples[pair] - points[neighbors[pair, slot]][:, None, :]) ** 2, axis=-1)
+        near = np.zeros(samples.shape[:2], dtype=bool)
+        hit, sample = np.nonzero(squared < radius * radius)
+        near[pair[hit], sample] = True
+        return near
+
+    edges = contour_edges(contours)
+
+    # probes outside the contours never become free, so cells along the outline retire too
+    cells = np.flatnonzero(interior)
+    probe_inside = np.ones((len(cells), len(probes)), dtype=bool)
+    test = on_edge[cells]
+    probe_inside[test] = points_inside_contours(contours, (cell_corner(cells[test])[:, None, :] + probes).reshape(-1, 2),
+        rule=rule, edges=edges).reshape(-1, len(probes))
+
+    phase = (cells // rows % 3) * 3 + cells % rows % 3
+    phases = [(cells[phase == k], probe_inside[phase == k]) for k in range(9)]
+    for _ in range(attempts):
+        for c, _ in phases:
+            c = c[grid[c] < 0]
+            if len(c) == 0:
+                continue
+
+            candidates = cell_corner(c) + rng.random((len(c), 2)) * cell
+            keep = ~covered(c, candidates[:, None, :])[:, 0]
+            c, candidates = c[keep], candidates[keep]
+
+            test = on_edge[c]
+            keep = np.ones(len(c), dtype=bool)
+            keep[test] = points_inside_contours(contours, candidates[test], rule=rule, edges=edges)
+            c, candidates = c[keep], candidates[keep]
+
+            grid[c] = np.arange(count, count + len(c))
+            points[count:count + len(c)] = candidates
+            count += len(c)
+
+        # retire filled cells and empty ones without a free probe
+        for k, (c, inside) in enumerate(phases):
+            empty = grid[c] < 0
+            c, inside = c[empty], inside[empty]
+            free = np.any(inside & ~covered(c, cell_corner(c)[:, None, :] + probes), axis=1)
+            phases[k] = (c[free], inside[free])
+
+        if sum(len(c) for c, _ in phases) == 0:
+            break
+
+    return points[:count].copy()
+
+
+def fitting_layer_count(layer_count: int, layer_spacing: float, depth: float = None):
+    """
+    Layers, at least one, layer_spacing apart fitting in a depth from 0
+    """
+    if depth is not None and layer_spacing > 0:
+        layer_count = min(layer_count, int(abs(depth) // layer_spacing) + 1)
+
+    return max(int(layer_count), 1)
+
+
+def layered_points(points, layer_count: int, layer_spacing: float, depth: float = None):
+    """
+    Stack 2D points into layers along z, one array operation
+    ::params:
+        points: (N, 2) points of the z = 0 layer
+        layer_count: number of layers, limited to the layers fitting in depth
+        layer_spacing: distance between layers
+        depth: signed extent of the volume along z from 0 (the glyph extrusion), None for no limit
+
+    Returns an (N * layers, 3) array, layer by layer, the first layer at z = 0.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    direction = -1.0 if depth is not None and depth < 0 else 1.0
+    layer_count = fitting_layer_count(layer_count, layer_spacing, depth)
+
+    layers = np.empty((layer_count, len(points), 3))
+    layers[:, :, :2] = points
+    layers[:, :, 2] = (np.arange(layer_count) * layer_spacing * direction)[:, None]
+
+    return layers.reshape(-1, 3)
+
+
+def sample_outline_uniform(outlines: list, count: int = None, spacing: float = None, curvature_weight: float = 0.0):
+    """
+    Place points evenly by arc length along all contours of the outlines
+    ::params:
+        outlines: list of (M, 2) closed contours
+        count: number of points K, or
+        spacing: target distance between points (K = total length / spacing)
+        curvature_weight: 0 is pure arc length, larger values move points toward sharp turns
+
+    Returns an (K, 2) array, contours get points in proportion to their (weighted) length.
+    """
+    outlines = [np.asarray(outline, dtype=np.float64).reshape(-1, 2) for outline in outlines if len(outline) > 1]
+    if len(outlines) == 0:
+        return np.empty((0, 2))
+
+    p1 = np.concatenate(outlines)
+    p2 = np.concatenate([np.roll(outline, -1, axis=0) for outline in outlines])
+    lengths = np.linalg.norm(p2 - p1, axis=1)
+
+    if count is None:
+        count = int(round(lengths.sum() / spacing)) if spacing else len(p1)
+    if count <= 0 or lengths.sum() == 0:
+        return np.empty((0, 2))
+
+    # every edge is sampled as three pieces (edge parameter ranges): head, middle and tail
+    starts = np.zeros((len(p1), 3))
+    ends = np.ones((len(p1), 3))
+    measure = np.zeros((len(p1), 3))
+    measure[:, 1] = lengths
+    if curvature_weight > 0:
+        splits = np.cumsum([len(outline) for outline in outlines])[:-1]
+        directions = np.split((p2 - p1) / np.maximum(lengths, 1e-12)[:, None], splits)
+        previous_directions = np.concatenate([np.roll(d, 1, axis=0) for d in directions])
+
+        # turning angle at p1 of every edge, and at its p2
+        turn = np.arccos(np.clip(np.sum(previous_directions * np.concatenate(directions), axis=1), -1.0, 1.0))
+        next_turn = np.concatenate([np.roll(t, -1) for t in np.split(turn, splits)])
+
+        # the weight of a turn is spread over the edge ends within a quarter mean edge length of the vertex,
+        # so points gather around sharp turns instead of piling up on them
+        mean_length = lengths.mean()
+        head = np.minimum(0.25 * mean_length / np.maximum(lengths, 1e-12), 0.5)
+        ends[:, 0], starts[:, 1], ends[:, 1], starts[:, 2] = head, head, 1 - head, 1 - head
+        measure[:, 0] = head * lengths + curvature_weight * mean_length * 0.5 * turn
+        measure[:, 1] = (1 - 2 * head) * lengths
+        measure[:, 2] = head * lengths + curvature_weight * mean_length * 0.5 * next_turn
+
+    starts, ends, measure = starts.ravel(), ends.ravel(), measure.ravel()
+
+    # stratified positions along the cumulative measure, then back to edge parameters
+    cumulative = np.cumsum(measure)
+    targets = (np.arange(count) + 0.5) * (cumulative[-1] / count)
+    piece = np.minimum(np.searchsorted(cumulative, targets, side="right"), len(measure) - 1)
+    fraction = np.clip((targets - (cumulative[piece] - measure[piece])) / np.maximum(measure[piece], 1e-12), 0.0, 1.0)
+    t = starts[piece] + fraction * (ends[piece] - starts[piece])
+    edge = piece // 3
+
+    return p1[edge] + t[:, None] * (p2[edge] - p1[edge])
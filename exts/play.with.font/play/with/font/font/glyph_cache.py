@@ -0,0 +1,362 @@
+# glyph tessellation cache
+import os
+import re
+import struct
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from shapely.geometry import Polygon
+
+
+class GlyphMesh():
+    def __init__(self, advance, contours, polygons, positions = None, normals = None, indices = None) -> None:
+        """
+        Tessellated glyph in glyph-local coordinates (pen position at the origin)
+        ::params:
+            advance: horizontal advance (glyph.advance.x)
+            contours: list of (M, 2) flattened contour points
+            polygons: list of contour index lists, outer contour first then its holes
+            positions, normals, indices: welded cap and bridge geometry, None if no mesh was built
+        """
+        self.advance = advance
+        self.contours = contours
+        self.polygons = polygons
+
+        self.positions = positions
+        self.normals = normals
+        self.indices = indices
+
+        self._shapes = None
+
+    @property
+    def shapes(self):
+        """
+        shapely Polygon of each entry in polygons, built once
+        """
+        if self._shapes is None:
+            self._shapes = [Polygon(self.contours[rings[0]], [self.contours[k] for k in rings[1:]]) for rings in self.polygons]
+
+        return self._shapes
+
+    @property
+    def hasMesh(self):
+        return self.positions is not None
+
+    @property
+    def nbytes(self):
+        """
+        Approximate memory held by the glyph
+        """
+        arrays = list(self.contours)
+        if self.hasMesh:
+            arrays += [self.positions, self.normals, self.indices]
+
+        return sum(a.nbytes for a in arrays) + 8 * sum(len(p) for p in self.polygons)
+
+
+class GlyphCache():
+    def __init__(self, max_bytes = 64 << 20) -> None:
+        """
+        LRU cache of GlyphMesh, bounded by the bytes of the cached arrays
+        """
+        self.max_bytes = max_bytes
+
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self._lock = threading.RLock()
+
+        # optional persistent DiskGlyphCache behind the memory cache
+        self.disk_cache = None
+
+        # counters: memory hits, glyphs read back from the disk cache, glyphs in neither
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, need_mesh = True):
+        """
+        Return the cached glyph (most recently used), then try the disk cache, or None
+        """
+        with self._lock:
+            glyph = self.entries.get(key)
+            if glyph is not None and (glyph.hasMesh or not need_mesh):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return glyph
+
+        if self.disk_cache is not None:
+            glyph = self.disk_cache.get(key, need_mesh=need_mesh)
+            if glyph is not None:
+                self.put(key, glyph, persist=False)
+                with self._lock:
+                    self.disk_hits += 1
+                return glyph
+
+        with self._lock:
+            self.misses += 1
+
+        return None
+
+    def put(self, key, glyph: GlyphMesh, persist = True):
+        if persist and self.disk_cache is not None:
+            self.disk_cache.put(key, glyph)
+
+        with self._lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key).nbytes
+
+            self.entries[key] = glyph
+            self.nbytes += glyph.nbytes
+
+            # evict least recently used, always keep the newest glyph
+            while self.nbytes > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "disk": self.disk_cache.stats() if self.disk_cache is not None else None,
+        }
+
+
+class DiskGlyphCache():
+    """
+    Persistent glyph cache, one flat binary file per glyph read back in a single call.
+
+    File layout (little-endian): a 48 byte header (magic, version, flags, advance, counts)
+    followed by contour lengths (uint32), contour points (float64), polygon sizes and
+    contour indices (uint32), positions and normals (float32) and indices (uint32).
+    """
+    MAGIC = b"PWFG"
+    VERSION = 1
+    HEADER = struct.Struct("<4sIIqIIIIII4x")
+    FOLDER = "playwithfont-glyphs"
+    CORRUPT = object()
+
+    def __init__(self, cache_dir, max_bytes = 256 << 20) -> None:
+        # versioned folders live in a folder the cache owns, cache_dir may hold anything else
+        self.root = os.path.join(cache_dir, self.FOLDER)
+        self.cache_dir = os.path.join(self.root, f"v{self.VERSION}")
+        self.max_bytes = max_bytes
+
+        # disk usage, scanned on first write
+        self.nbytes = None
+
+        # font file -> (mtime, size, content hash)
+        self.font_hashes = {}
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.removeStaleVersions()
+
+    def removeStaleVersions(self):
+        """
+        Delete cache folders written by other format versions
+        """
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if re.fullmatch(r"v\d+", name) and path != self.cache_dir and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def fontHash(self, font_file):
+        """
+        Content hash of a font file, recomputed only when the file changes
+        """
+        stat = os.stat(font_file)
+        cached = self.font_hashes.get(font_file)
+        if cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size):
+            with open(font_file, "rb") as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            cached = (stat.st_mtime_ns, stat.st_size, digest)
+            self.font_hashes[font_file] = cached
+
+        return cached[2]
+
+    def glyphPath(self, key):
+        """
+        key: (font file, char, height, bezierSteps, extrude, bevelRadius, bevelSteps)
+        """
+        disk_key = repr((self.fontHash(key[0]),) + tuple(key[1:]))
+        return os.path.join(self.cache_dir, hashlib.sha1(disk_key.encode("utf-8")).hexdigest() + ".bin")
+
+    def get(self, key, need_mesh = True):
+        path = self.glyphPath(key)
+        try:
+            glyph = self.read(path)
+        except FileNotFoundError:
+            glyph = None
+        except (OSError, ValueError, struct.error):
+            glyph = self.CORRUPT
+
+        if glyph is self.CORRUPT: # truncated or foreign file, e.g. from a killed session
+            self.remove(path)
+            glyph = None
+
+        if glyph is None or (need_mesh and not glyph.hasMesh):
+            self.misses += 1
+            return None
+
+        # mtime is the LRU clock for eviction
+        os.utime(path)
+        self.hits += 1
+        return glyph
+
+    def put(self, key, glyph: GlyphMesh):
+        path = self.glyphPath(key)
+        data = self.pack(glyph)
+
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        if self.nbytes is None:
+            self.nbytes = sum(entry.stat().st_size for entry in os.scandir(self.cache_dir) if entry.name.endswith(".bin"))
+        else:
+            self.nbytes += len(data) - old_size
+
+        if self.nbytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """
+        Delete least recently used glyph files until the cache fits in max_bytes
+        """
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".bin")]
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+
+        self.nbytes = sum(entry.stat().st_size for entry in entries)
+        for entry in entries[:-1]:
+            if self.nbytes <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except OSError: # open in another session (Windows) or already removed
+                continue
+
+            self.nbytes -= size
+            self.evictions += 1
+
+    def remove(self, path):
+        """
+        Delete one glyph file, keeping the disk usage in step
+        """
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+
+        if self.nbytes is not None:
+            self.nbytes -= size
+
+    def pack(self, glyph: GlyphMesh):
+        contour_lengths = np.array([len(c) for c in glyph.contours], dtype="<u4")
+        contour_points = np.concatenate(glyph.contours).astype("<f8") if len(glyph.contours) > 0 else np.empty((0, 2), "<f8")
+        polygon_sizes = np.array([len(p) for p in glyph.polygons], dtype="<u4")
+        polygon_indices = np.array([i for p in glyph.polygons for i in p], dtype="<u4")
+
+        arrays = [contour_lengths, contour_points, polygon_sizes, polygon_indices]
+        vertex_count = index_count = 0
+        if glyph.hasMesh:
+            vertex_count, index_count = len(glyph.positions), len(glyph.indices)
+            arrays += [glyph.positions.astype("<f4"), glyph.normals.astype("<f4"), glyph.indices.astype("<u4")]
+
+        header = self.HEADER.pack(self.MAGIC, self.VERSION, int(glyph.hasMesh), int(glyph.advance),
+            len(contour_lengths), len(contour_points), len(polygon_sizes), len(polygon_indices), vertex_count, index_count)
+
+        return header + b"".join(a.tobytes() for a in arrays)
+
+    def read(self, path):
+        """
+        Read a glyph file in one call, the returned arrays are read-only views into its bytes
+        (no mapping or file handle is kept open per cached glyph).
+        Returns CORRUPT when the file is shorter than its header says.
+        """
+        with open(path, "rb") as f:
+            buffer = f.read()
+
+        if len(buffer) < self.HEADER.size:
+            return self.CORRUPT
+
+        magic, version, has_mesh, advance, contour_count, point_count, polygon_count, ring_count, vertex_count, index_count = \
+            self.HEADER.unpack_from(buffer, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            return self.CORRUPT
+
+        payload_size = 4 * contour_count + 16 * point_count + 4 * polygon_count + 4 * ring_count
+        if has_mesh:
+            payload_size += 24 * vertex_count + 4 * index_count
+        if self.HEADER.size + payload_size > len(buffer):
+            return self.CORRUPT
+
+        offset = self.HEADER.size
+        def take(dtype, count, shape = None):
+            nonlocal offset
+            array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+            offset += array.nbytes
+            return array.reshape(shape) if shape else array
+
+        contour_lengths = take("<u4", contour_count)
+        contour_points = take("<f8", 2 * point_count, (-1, 2))
+        polygon_sizes = take("<u4", polygon_count)
+        polygon_indices = take("<u4", ring_count)
+
+        contours = np.split(contour_points, np.cumsum(contour_lengths)[:-1]) if contour_count > 0 else []
+        polygons = [p.tolist() for p in np.split(polygon_indices, np.cumsum(polygon_sizes)[:-1])] if polygon_count > 0 else []
+
+        glyph = GlyphMesh(advance, contours, polygons)
+        if has_mesh:
+            glyph.positions = take("<f4", 3 * vertex_count, (-1, 3))
+            glyph.normals = take("<f4", 3 * vertex_count, (-1, 3))
+            glyph.indices = take("<u4", index_count)
+
+        return glyph
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.nbytes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# shared by all MeshGenerator instances
+GLYPH_CACHE = GlyphCache()
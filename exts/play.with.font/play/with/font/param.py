@@ -10,4 +10,14 @@ EXTENSION_FOLDER_PATH = Path(
 EXTENSION_ROOT = str(EXTENSION_FOLDER_PATH.resolve())
 print("EXTENSION_ROOT: ", EXTENSION_ROOT)  
 
-FONT_TYPES = os.listdir(os.path.join(EXTENSION_ROOT, "fonts"))
\ No newline at end of file
+FONT_TYPES = sorted(f for f in os.listdir(os.path.join(EXTENSION_ROOT, "fonts")) if f.lower().endswith((".ttf", ".otf")))
+
+# persistent glyph mesh cache
+GLYPH_CACHE_DIR = os.path.join(EXTENSION_ROOT, "cache", "glyphs")
+GLYPH_CACHE_MAX_BYTES = 256 << 20
+
+# generators kept for flow and fluid effects of recent 3D texts
+MESH_GENERATOR_CACHE_SIZE = 16
+
+# fluid particle seeding modes (see MeshGenerator.getSeedPointsInside), the first is the default
+FLUID_SEEDING_MODES = ["grid", "hex", "poisson", "jitter"]
@@ -0,0 +1,191 @@
+# headless authoring pipeline: text mesh, flow emitters and fluid particles on any Usd.Stage,
+# without Kit UI (only pxr, PhysX schemas are used when the pxr build has them)
+import numpy as np
+from pxr import Usd, UsdGeom, UsdPhysics, Sdf, Gf, Vt
+
+try:
+    from pxr import PhysxSchema
+except ImportError: # plain usd-core: fluid particles are authored as geometry only
+    PhysxSchema = None
+
+from .font.font_create import MeshGenerator
+from .font.font_usd import define_font_mesh
+from .flow.flow_author import author_flow_emitters, author_flow_point_emitter, author_flow_template, emitter_attributes, \
+    reference_flow_template, set_prims_active, author_basic_flow_effect
+from .flow.param import FLOW_CONFIG
+from .fluid.param import PARTICLE_PROPERTY
+from .fluid.fluid_util import particle_positions
+
+
+def new_stage():
+    """
+    In-memory stage set up like the extension scene: Y up, /World default prim
+    """
+    stage = Usd.Stage.CreateInMemory()
+    UsdGeom.SetStageUpAxis(stage, UsdGeom.Tokens.y)
+    stage.SetDefaultPrim(UsdGeom.Xform.Define(stage, "/World").GetPrim())
+
+    return stage
+
+
+def next_free_path(stage, path):
+    """
+    path, or path_01, path_02... whichever is not on the stage yet
+    """
+    candidate, index = path, 0
+    while stage.GetPrimAtPath(candidate).IsValid():
+        index += 1
+        candidate = f"{path}_{index:02d}"
+
+    return candidate
+
+
+def _match_transform(stage, prim_path, target_prim):
+    """
+    Place prim_path at the rotation and translation (no scale) of target_prim
+    """
+    matrix = UsdGeom.Xformable(target_prim).ComputeLocalToWorldTransform(Usd.TimeCode.Default())
+    new_matrix = Gf.Matrix4d().SetRotate(matrix.ExtractRotation()) * Gf.Matrix4d().SetTranslate(matrix.ExtractTranslation())
+
+    xformable = UsdGeom.Xformable(stage.GetPrimAtPath(prim_path))
+    xformable.ClearXformOpOrder()
+    xformable.AddTransformOp().Set(new_matrix)
+
+
+def author_text(stage, text, font_file, height = 52, extrude = 768, prim_path = "/World/font3d", scale = 10,
+    mesh_generator = None):
+    """
+    Generate and author a 3D text mesh
+    ::params:
+        extrude: depth of the text in font units (the extension UI default is 768)
+        mesh_generator: reuse an already generated MeshGenerator
+
+    Returns the font prim and its MeshGenerator (for flow and fluid authoring).
+    """
+    if mesh_generator is None:
+        mesh_generator = MeshGenerator(font_file, height=height, text=text, extrude=-extrude)
+        mesh_generator.generateMesh(create_obj=True)
+
+    font_prim_path = next_free_path(stage, prim_path)
+    font_xform = UsdGeom.Xform.Define(stage, font_prim_path)
+    font_xform.AddTranslateOp()
+    font_xform.AddRotateXYZOp()
+    font_xform.AddScaleOp().Set(Gf.Vec3f(scale, scale, scale))
+
+    define_font_mesh(stage, f"{font_prim_path}/mesh", mesh_generator.mesh)
+
+    font_prim = font_xform.GetPrim()
+    font_prim.CreateAttribute("font:input_text", Sdf.ValueTypeNames.String, False).Set(text)
+
+    return font_prim, mesh_generator
+
+
+def author_flow(stage, font_prim, mesh_generator, flow_type = "Fire", density = 0.2, max_emitters = 256, radius = 5.0,
+    cooling_rate = 1.5, emitter_mode = "sphere", scale = 10, create_effect = author_basic_flow_effect):
+    """
+    Author flow emitters along the text outline, sharing the per-stage flow_type template
+    ::params:
+        density: emitter spacing is 50 / density font units
+        emitter_mode: "sphere" (an Xform and emitter per point) or "point" (one FlowEmitterPoint)
+        create_effect: builds the template effect, see flow_author.author_flow_template
+
+    Returns the flow root prim.
+    """
+    points = mesh_generator.getEmitterPoints(spacing=50 / density, max_count=max_emitters) / scale
+    points = np.column_stack([points, np.zeros(len(points))])
+
+    flow_root_path = next_free_path(stage, f"{font_prim.GetPath().pathString}_Flow")
+    UsdGeom.Xform.Define(stage, flow_root_path)
+
+    author_flow_template(stage, flow_type, create_effect=create_effect)
+    layer = FLOW_CONFIG[flow_type]["layer"]
+    attributes = emitter_attributes(flow_type, radius, layer)
+
+    if len(points) > 0:
+        # the first Xform instances the effect, at the origin when a point emitter carries all positions
+        xform = UsdGeom.Xform.Define(stage, f"{flow_root_path}/Xform_0")
+        xform.AddTranslateOp().Set(Gf.Vec3d(*(points[0] if emitter_mode == "sphere" else (0.0, 0.0, 0.0))))
+        emitter = reference_flow_template(stage, xform.GetPath(), flow_type, cooling_rate=cooling_rate, radius=radius)
+
+        edit_layer = stage.GetEditTarget().GetLayer()
+        if emitter_mode == "point":
+            set_prims_active(edit_layer, [emitter.GetPath()], False)
+            author_flow_point_emitter(edit_layer, xform.GetPath().AppendChild("flowEmitterPoint"), points, attributes)
+        else:
+            author_flow_emitters(edit_layer, flow_root_path, points[1:].tolist(), attributes, start_index=1)
+
+    _match_transform(stage, flow_root_path, font_prim)
+
+    return stage.GetPrimAtPath(flow_root_path)
+
+
+def author_fluid(stage, font_prim, mesh_generator, grid_size = 40, radius = 5.0, scale = 10, fluid_path = None, seeding = "grid",
+    seed = None, layer_count = 1, particle_count = None, particle_system_path = None):
+    """
+    Author fluid particles on a lattice inside the text as a point instancer,
+    with a PhysX particle system when the pxr build has the PhysX schemas
+    ::params:
+        grid_size: lattice spacing in font units (the extension "Particle offset")
+        seeding: "grid", "hex", "poisson" or "jitter", see MeshGenerator.getSeedPointsInside
+        layer_count: particle layers through the extrusion, one fluid sphere diameter apart
+        particle_count: target particle count, grid_size is then derived from the text area
+        particle_system_path: join this existing particle system as a new particle set instead of creating one
+        radius: particle prototype radius
+
+    Returns the particle point instancer prim.
+    """
+    PARTICLE_PROPERTY.set_partical_properties()
+
+    layer_spacing = PARTICLE_PROPERTY._fluidSphereDiameter * scale
+    if particle_count:
+        grid_size = mesh_generator.getGridSizeForCount(particle_count, mode=seeding, layer_count=layer_count, layer_spacing=layer_spacing,
+            default=grid_size)
+
+    points = mesh_generator.getSeedPointsInVolume(grid_size=grid_size, mode=seeding, seed=seed, layer_count=layer_count,
+        layer_spacing=layer_spacing)
+    positions = particle_positions(points, scale)
+
+    # physics scene
+    physics_scene_path = "/World/physicsScene"
+    if not stage.GetPrimAtPath(physics_scene_path).IsValid():
+        UsdPhysics.Scene.Define(stage, physics_scene_path)
+
+    fluid_path = next_free_path(stage, fluid_path or f"{font_prim.GetPath().pathString}_Fluid")
+    instancer = UsdGeom.PointInstancer.Define(stage, fluid_path)
+
+    prototype = UsdGeom.Sphere.Define(stage, f"{fluid_path}/particlePrototype0")
+    prototype.CreateRadiusAttr().Set(radius)
+    prototype.CreateExtentAttr().Set([Gf.Vec3f(-radius), Gf.Vec3f(radius)])
+    instancer.CreatePrototypesRel().SetTargets([prototype.GetPath()])
+
+    instancer.CreatePositionsAttr().Set(Vt.Vec3fArray.FromNumpy(positions))
+    instancer.CreateVelocitiesAttr().Set(Vt.Vec3fArray.FromNumpy(np.zeros_like(positions)))
+    instancer.CreateProtoIndicesAttr().Set(Vt.IntArray.FromNumpy(np.zeros(len(positions), dtype=np.int32)))
+
+    if PhysxSchema is not None:
+        parameters = PARTICLE_PROPERTY._particleSystemSchemaParameters
+
+        if particle_system_path is None or not stage.GetPrimAtPath(particle_system_path).IsValid():
+            particle_system_path = next_free_path(stage, particle_system_path or "/World/Fluid")
+            particle_system = PhysxSchema.PhysxParticleSystem.Define(stage, particle_system_path)
+            particle_system.CreateSimulationOwnerRel().SetTargets([Sdf.Path(physics_scene_path)])
+            particle_system.CreateContactOffsetAttr().Set(parameters["contact_offset"])
+            particle_system.CreateParticleContactOffsetAttr().Set(parameters["particle_contact_offset"])
+            particle_system.CreateRestOffsetAttr().Set(parameters["rest_offset"])
+            particle_system.CreateSolidRestOffsetAttr().Set(parameters["solid_rest_offset"])
+            particle_system.CreateFluidRestOffsetAttr().Set(parameters["fluid_rest_offset"])
+            particle_system.CreateSolverPositionIterationCountAttr().Set(parameters["solver_position_iterations"])
+            particle_system.CreateWindAttr().Set(parameters["wind"])
+            particle_system.CreateMaxVelocityAttr().Set(parameters["max_velocity"])
+
+        particle_set = PhysxSchema.PhysxParticleSetAPI.Apply(instancer.GetPrim())
+        particle_set.CreateSelfCollisionAttr().Set(True)
+        particle_set.CreateFluidAttr().Set(True)
+        particle_set.CreateParticleGroupAttr().Set(0)
+        particle_set.CreateParticleSystemRel().SetTargets([Sdf.Path(particle_system_path)])
+
+        UsdPhysics.MassAPI.Apply(instancer.GetPrim()).CreateMassAttr().Set(PARTICLE_PROPERTY._particle_mass * len(positions))
+
+    _match_transform(stage, fluid_path, font_prim)
+
+    return instancer.GetPrim()